@@ -19,7 +19,7 @@ warn_if_not_compatible()
 from .utils import *
 from .simple_glazing import *
 from .energypandas import EnergySeries, EnergyDataFrame
-from .reportdata import ReportData
+from .reportdata import ReportData, ReportDataSidecar
 from .schedule import Schedule
 from .plot import *
 from .eplus_interface import *
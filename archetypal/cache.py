@@ -0,0 +1,277 @@
+################################################################################
+# Module: cache.py
+# Description: Content-addressed cache for simulation results
+# License: MIT, see full license in LICENSE.txt
+# Web: https://github.com/samuelduchesne/archetypal
+################################################################################
+
+import json
+import logging as lg
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from path import Path
+
+from archetypal import settings
+from archetypal.utils import link_or_copy, log
+
+
+class ResultCache:
+    """A content-addressed store of simulation results.
+
+    Each entry is a directory named after its key (a digest computed by the caller,
+    see :func:`~archetypal.idfclass.util.hash_model`). A manifest file indexes the
+    entries with their size and last access time so that lookups do not have to
+    walk the cache folder and so that the least recently used entries can be
+    evicted once the cache exceeds its size limit.
+
+    Entries are published atomically: files are first staged in a temporary
+    directory which is then renamed to its final location. Concurrent workers
+    therefore either see a complete entry or no entry at all.
+
+    Example:
+        >>> from archetypal.cache import ResultCache
+        >>> cache = ResultCache("cache/results", size_limit=10e9)
+        >>> cache.put(idf.sim_id, idf.simulation_dir)
+        >>> cache.get(idf.sim_id)
+    """
+
+    MANIFEST = "manifest.json"
+    LOCK = "manifest.lock"
+
+    def __init__(self, root, size_limit=None, lock_timeout=60):
+        """Initialize a ResultCache.
+
+        Args:
+            root (str or Path): The folder where entries are stored.
+            size_limit (int, optional): The disk budget in bytes. If None, entries
+                are never evicted.
+            lock_timeout (float): Number of seconds after which a lock on the
+                manifest is considered stale and is broken.
+        """
+        self.root = Path(root).expand()
+        self.size_limit = size_limit
+        self.lock_timeout = lock_timeout
+
+    def __contains__(self, key):
+        return os.path.isdir(self._entry_path(key))
+
+    def __len__(self):
+        return len(self._read_manifest())
+
+    @property
+    def size(self):
+        """int: The total size in bytes of the cached entries."""
+        return sum(entry["size"] for entry in self._read_manifest().values())
+
+    def get(self, key):
+        """Return the path of the entry for `key` and mark it as recently used.
+
+        Args:
+            key (str): The digest identifying the entry.
+
+        Returns:
+            Path or None: The entry folder, or None if the key is not cached.
+        """
+        entry_path = self._entry_path(key)
+        if not os.path.isdir(entry_path):
+            return None
+        with self._lock():
+            manifest = self._read_manifest()
+            entry = manifest.get(key)
+            if entry is None:
+                # Entry published without a manifest record (e.g. the manifest
+                # was deleted); index it again.
+                entry = dict(size=_folder_size(entry_path), created=time.time())
+                manifest[key] = entry
+            entry["last_access"] = time.time()
+            self._write_manifest(manifest)
+        return entry_path
+
+    def put(self, key, folder, files=None):
+        """Publish the content of `folder` under `key`.
+
+        Files are hard linked when possible (the cache usually lives on the same
+        file system as the simulation folders) and copied otherwise. If another
+        process already published the same key, the existing entry is kept.
+
+        Args:
+            key (str): The digest identifying the entry.
+            folder (str or Path): The folder containing the files to cache.
+            files (list of str, optional): Only publish these files of `folder`
+                (relative paths); missing files are ignored. Defaults to all the
+                files of `folder`.
+
+        Returns:
+            Path: The entry folder.
+        """
+        folder = Path(folder)
+        entry_path = self._entry_path(key)
+        if os.path.isdir(entry_path):
+            return self.get(key)
+
+        self.root.makedirs_p()
+        staging = self.root / f".staging-{key}-{uuid.uuid4().hex}"
+        staging.makedirs_p()
+        if files is None:
+            files = folder.walkfiles()
+        else:
+            files = [folder / file for file in files if (folder / file).exists()]
+        for file in files:
+            target = staging / folder.relpathto(file)
+            target.dirname().makedirs_p()
+            link_or_copy(file, target)
+        try:
+            os.replace(staging, entry_path)
+        except OSError:
+            # Lost the race against another worker publishing the same key.
+            staging.rmtree_p()
+            return self.get(key)
+
+        with self._lock():
+            manifest = self._read_manifest()
+            now = time.time()
+            manifest[key] = dict(
+                size=_folder_size(entry_path), created=now, last_access=now
+            )
+            self._evict(manifest, keep=key)
+            self._write_manifest(manifest)
+        log(f"cached simulation results '{key}' in {self.root}", lg.DEBUG)
+        return entry_path
+
+    def restore(self, key, folder):
+        """Copy (or hard link) the entry for `key` into `folder`.
+
+        Args:
+            key (str): The digest identifying the entry.
+            folder (str or Path): The destination folder.
+
+        Returns:
+            Path or None: The destination folder, or None if the key is not
+            cached.
+        """
+        entry_path = self.get(key)
+        if entry_path is None:
+            return None
+        folder = Path(folder)
+        for file in entry_path.walkfiles():
+            target = folder / entry_path.relpathto(file)
+            if not target.exists():
+                target.dirname().makedirs_p()
+                link_or_copy(file, target)
+        return folder
+
+    def remove(self, key):
+        """Remove the entry for `key` from the cache."""
+        with self._lock():
+            manifest = self._read_manifest()
+            manifest.pop(key, None)
+            self._discard(key)
+            self._write_manifest(manifest)
+
+    def evict(self):
+        """Evict the least recently used entries until the size limit is met."""
+        with self._lock():
+            manifest = self._read_manifest()
+            self._evict(manifest)
+            self._write_manifest(manifest)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock():
+            for key in self._read_manifest():
+                self._discard(key)
+            self._write_manifest({})
+
+    def _evict(self, manifest, keep=None):
+        if self.size_limit is None:
+            return
+        total = sum(entry["size"] for entry in manifest.values())
+        lru = sorted(manifest.items(), key=lambda item: item[1]["last_access"])
+        for key, entry in lru:
+            if total <= self.size_limit:
+                break
+            if key == keep:
+                continue
+            self._discard(key)
+            total -= entry["size"]
+            del manifest[key]
+            log(f"evicted cached simulation results '{key}'", lg.DEBUG)
+
+    def _discard(self, key):
+        entry_path = self._entry_path(key)
+        if os.path.isdir(entry_path):
+            # Rename first so that readers never see a partially deleted entry.
+            trash = self.root / f".trash-{key}-{uuid.uuid4().hex}"
+            try:
+                os.replace(entry_path, trash)
+            except OSError:
+                return
+            trash.rmtree_p()
+
+    def _entry_path(self, key):
+        return self.root / key
+
+    def _read_manifest(self):
+        try:
+            with open(self.root / self.MANIFEST, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest):
+        self.root.makedirs_p()
+        tmp = self.root / f".{self.MANIFEST}-{uuid.uuid4().hex}"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.root / self.MANIFEST)
+
+    @contextmanager
+    def _lock(self):
+        """Inter-process lock on the manifest using an exclusively created file."""
+        self.root.makedirs_p()
+        lock_file = self.root / self.LOCK
+        start_time = time.time()
+        while True:
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    stale = time.time() - lock_file.getmtime() > self.lock_timeout
+                except OSError:
+                    continue  # lock was just released
+                if stale or time.time() - start_time > self.lock_timeout:
+                    log(f"breaking stale lock {lock_file}", lg.DEBUG)
+                    lock_file.remove_p()
+                time.sleep(0.01)
+            else:
+                break
+        try:
+            yield
+        finally:
+            os.close(fd)
+            lock_file.remove_p()
+
+
+def _folder_size(folder):
+    """Return the size in bytes of all the files in `folder`."""
+    return sum(file.size for file in Path(folder).walkfiles())
+
+
+def get_simulation_cache():
+    """Return the :class:`ResultCache` of simulation results configured by
+    `settings.cache_folder` and `settings.cache_size_limit`."""
+    return ResultCache(
+        settings.cache_folder / "results", size_limit=settings.cache_size_limit
+    )
+
+
+def get_preprocessor_cache():
+    """Return the :class:`ResultCache` of the outputs of the preprocessor programs
+    (ExpandObjects, Basement and Slab) configured by `settings.cache_folder` and
+    `settings.cache_size_limit`."""
+    return ResultCache(
+        settings.cache_folder / "preprocessors", size_limit=settings.cache_size_limit
+    )
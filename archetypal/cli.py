@@ -17,7 +17,7 @@ from archetypal import (
     convert_idf_to_trnbuild,
     docstring_parameter,
     log,
-    parallel_process,
+    run_batch,
     settings,
     timeit,
 )
@@ -375,6 +375,12 @@ def convert(
     default=False,
     help="Include all zones in the " "output template",
 )
+@click.option(
+    "--retries",
+    default=0,
+    show_default=True,
+    help="Number of times a failed simulation is retried",
+)
 @click.option(
     "-v",
     "--version",
@@ -383,7 +389,7 @@ def convert(
     help="EnergyPlus version to upgrade to - e.g., '9-2-0'",
 )
 @click.pass_context
-def reduce(ctx, idf, output, weather, cores, all_zones, as_version):
+def reduce(ctx, idf, output, weather, cores, all_zones, retries, as_version):
     """Convert EnergyPlus models to an Umi Template Library by using the model
     complexity reduction algorithm.
 
@@ -420,6 +426,7 @@ def reduce(ctx, idf, output, weather, cores, all_zones, as_version):
         weather=weather,
         name=name,
         processors=cores,
+        retries=retries,
         as_version=as_version,
         annual=True,
     )
@@ -513,7 +520,7 @@ def transition(idf, to_version, cores, yes):
         )
         for i, file in enumerate(file_paths)
     }
-    results = parallel_process(
+    results = run_batch(
         rundict,
         IDF,
         processors=cores,
@@ -522,9 +529,9 @@ def transition(idf, to_version, cores, yes):
         debug=True,
     )
 
-    # Save results to file (overwriting if True)
+    # Save results to file (overwriting if True), as they come
     file_list = []
-    for idf in results:
+    for _, idf in results:
         if isinstance(idf, IDF):
             if overwrite:
                 file_list.append(idf.original_idfname)
@@ -7,16 +7,22 @@ __all__ = [
     "EnergyPlusProgram",
     "EnergyPlusVersionError",
     "EnergyPlusWeatherError",
+    "EnergyPlusOutputParser",
+    "RunManifest",
+    "SimulationEvent",
     "BasementThread",
     "EnergyPlusThread",
     "ExpandObjectsThread",
     "SlabThread",
     "TransitionThread",
     "get_eplus_dirs",
+    "run_process_async",
 ]
 
+from .async_process import run_process_async
 from .basement import BasementThread
 from .energy_plus import EnergyPlusProgram, EnergyPlusThread
+from .events import EnergyPlusOutputParser, RunManifest, SimulationEvent
 from .exceptions import (
     EnergyPlusProcessError,
     EnergyPlusVersionError,
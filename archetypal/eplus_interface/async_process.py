@@ -0,0 +1,58 @@
+"""Run EnergyPlus programs as asyncio subprocesses."""
+
+import asyncio
+import logging as lg
+
+from archetypal.utils import log
+
+
+async def run_process_async(cmd, cwd=None, msg_callback=None, timeout=None):
+    """Run a program with :func:`asyncio.create_subprocess_exec`.
+
+    The standard output is streamed line by line to `msg_callback` while the
+    program runs, so that many programs can be driven from a single event loop
+    without a thread per program. If the task running this coroutine is
+    cancelled or if `timeout` elapses, the program is killed before the
+    exception is propagated.
+
+    Args:
+        cmd (list): The program and its arguments.
+        cwd (str or Path, optional): The directory in which the program is run.
+        msg_callback (callable, optional): Called with each line (str) of the
+            standard output.
+        timeout (float, optional): Number of seconds after which the program is
+            killed and :class:`asyncio.TimeoutError` is raised.
+
+    Returns:
+        tuple: The :class:`asyncio.subprocess.Process`, once it has exited, and
+        its standard error (str).
+    """
+    p = await asyncio.create_subprocess_exec(
+        *[str(arg) for arg in cmd],
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=None if cwd is None else str(cwd),
+    )
+    stderr = asyncio.ensure_future(p.stderr.read())
+    try:
+        await asyncio.wait_for(_stream(p, msg_callback), timeout)
+    except BaseException:
+        # Cancelled or timed out: do not leave the program running.
+        stderr.cancel()
+        if p.returncode is None:
+            log(f"killing '{cmd[0]}' (pid {p.pid})", lg.DEBUG)
+            p.kill()
+            await p.wait()
+        raise
+    return p, (await stderr).decode("utf-8")
+
+
+async def _stream(p, msg_callback):
+    """Pass the standard output of `p` to `msg_callback` until `p` exits."""
+    while True:
+        line = await p.stdout.readline()
+        if not line:
+            break
+        if msg_callback is not None:
+            msg_callback(line.decode("utf-8").rstrip("\r\n"))
+    return await p.wait()
@@ -10,12 +10,14 @@ from eppy.runner.run_functions import paths_from_version
 from path import Path
 from tqdm import tqdm
 
+from archetypal import settings
+from archetypal.cache import get_preprocessor_cache
 from ..eplus_interface.exceptions import (
     EnergyPlusProcessError,
     EnergyPlusVersionError,
 )
 from ..eplus_interface.version import EnergyPlusVersion
-from archetypal.utils import log
+from archetypal.utils import log, move_or_copy
 
 
 class BasementThread(Thread):
@@ -25,8 +27,15 @@ class BasementThread(Thread):
     EnergyPlus distribution. It requires an input file named GHTin.idf in
     input data file format. The needed corresponding idd file is
     SlabGHT.idd. An EnergyPlus weather file for the location is also needed.
+
+    When `settings.use_cache` is True, the outputs are cached keyed on the
+    content of BasementGHTIn.idf and of the weather file.
     """
 
+    # Cached outputs of the program. The debug files are not cached since they
+    # are appended to (restored files are hard links to the cache entry).
+    OUTPUTS = ["MonthlyResults.csv", "RunINPUT.TXT", "EPObjects.txt"]
+
     def __init__(self, idf, tmp):
         """Constructor."""
         super(BasementThread, self).__init__()
@@ -39,6 +48,7 @@ class BasementThread(Thread):
         self.exception = None
         self.name = "RunBasement_" + self.idf.name
         self.include = None
+        self.cache_key = None
 
     @property
     def cmd(self):
@@ -51,6 +61,15 @@ class BasementThread(Thread):
         self.cancelled = False
         # get version from IDF object or by parsing the IDF file for it
 
+        # The BasementGHTin.idf file is copied from the self.include list (
+        # added by ExpandObjects). If there is no BasementGHTin.idf, no need to
+        # run Basement.
+        if "BasementGHTIn.idf" not in [
+            Path(file).basename() for file in self.idf.include
+        ]:
+            self.cleanup_callback()
+            return
+
         # Move files into place
         # copy "%wthrfile%.epw" in.epw
         self.epw = self.idf.epw.copy(self.run_dir / "in.epw").expand()
@@ -69,13 +88,23 @@ class BasementThread(Thread):
         ).copy(self.run_dir)
         self.outfile = self.idf.name
 
-        # The BasementGHTin.idf file is copied from the self.include list (
-        # added by ExpandObjects. If self.include is empty, no need to run
-        # Basement.
         self.include = [Path(file).copy(self.run_dir) for file in self.idf.include]
-        if "BasementGHTIn.idf" not in self.include:
-            self.cleanup_callback()
-            return
+
+        # Reuse the outputs of a previous run with the same inputs
+        if settings.use_cache:
+            from archetypal.idfclass.util import hash_model
+
+            self.cache_key = hash_model(
+                self.run_dir / "BasementGHTIn.idf",
+                epw=[self.epw],
+                ep_version=self.idf.as_version,
+                program="Basement",
+            )
+            if get_preprocessor_cache().restore(self.cache_key, self.run_dir):
+                self.msg_callback(f"RunBasement cache hit '{self.cache_key}'")
+                self.success_callback()
+                return
+            self.msg_callback(f"RunBasement cache miss '{self.cache_key}'")
 
         self.msg_callback(
             "===== (Run Basement Temperature Generation) ===== Start ====="
@@ -127,6 +156,10 @@ class BasementThread(Thread):
                             time.time() - start_time
                         )
                     )
+                    if self.cache_key is not None:
+                        get_preprocessor_cache().put(
+                            self.cache_key, self.run_dir, files=self.OUTPUTS
+                        )
                     self.success_callback()
                     for line in self.p.stderr:
                         self.msg_callback(line.decode("utf-8"))
@@ -142,17 +175,21 @@ class BasementThread(Thread):
         """Parse surface temperature and append to IDF file."""
         csv_ = self.run_dir / "MonthlyResults.csv"
         if csv_.exists():
-            csv_ = csv_.rename(self.idf.output_directory / f"{self.outfile}_bsmt.csv")
+            csv_ = move_or_copy(
+                csv_, self.idf.output_directory / f"{self.outfile}_bsmt.csv"
+            )
 
         input_ = self.run_dir / "RunINPUT.TXT"
         if input_.exists():
-            input_ = input_.rename(
-                self.idf.output_directory / f"{self.outfile}_bsmt.out"
+            input_ = move_or_copy(
+                input_, self.idf.output_directory / f"{self.outfile}_bsmt.out"
             )
 
         debug_ = self.run_dir / "RunDEBUGOUT.txt"
         if debug_.exists():
-            debug_ = debug_.rename(self.idf.output_directory / "basementout.audit")
+            debug_ = move_or_copy(
+                debug_, self.idf.output_directory / "basementout.audit"
+            )
 
         err_ = self.run_dir / "eplusout.err"
         if err_.exists():
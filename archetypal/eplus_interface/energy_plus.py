@@ -1,6 +1,8 @@
 import logging as lg
+import os
 import subprocess
 import time
+from fnmatch import fnmatch
 from subprocess import CalledProcessError
 from threading import Thread
 
@@ -9,12 +11,19 @@ from eppy.runner.run_functions import paths_from_version
 from path import Path
 from tqdm import tqdm
 
+from archetypal.eplus_interface.async_process import run_process_async
+from archetypal.eplus_interface.events import (
+    ERROR,
+    EnergyPlusOutputParser,
+    RunManifest,
+)
 from archetypal.eplus_interface.exceptions import (
     EnergyPlusProcessError,
     EnergyPlusVersionError,
 )
 from archetypal.eplus_interface.version import EnergyPlusVersion
-from archetypal.utils import log
+from archetypal.memory import get_memory_history, wait_peak_rss
+from archetypal.utils import log, move_or_copy
 
 
 class EnergyPlusProgram:
@@ -139,12 +148,14 @@ class EnergyPlusExe:
 
 
 class EnergyPlusThread(Thread):
-    def __init__(self, idf, tmp):
+    def __init__(self, idf, tmp, manifest=None):
         """
 
         Args:
             idf (IDF): The idf model.
             tmp (str or Path): The directory in which the process will be launched.
+            manifest (RunManifest, optional): Records the time of the "EnergyPlus"
+                and "publish" stages.
         """
         super(EnergyPlusThread, self).__init__()
         self.p = None
@@ -156,6 +167,9 @@ class EnergyPlusThread(Thread):
         self.exception = None
         self.name = "EnergyPlus_" + self.idf.name
         self.tmp = tmp
+        self.manifest = manifest if manifest is not None else RunManifest(idf.name)
+        self.parser = None
+        self.peak_rss = None
 
     def stop(self):
         if self.p.poll() is None:
@@ -169,14 +183,84 @@ class EnergyPlusThread(Thread):
         Adapted from :func:`eppy.runner.runfunctions.run`.
         """
         self.cancelled = False
-        # get version from IDF object or by parsing the IDF file for it
+        if not self.prepare():
+            return
+
+        # Start process with a tqdm bar of the percentage of the run period done
+        with tqdm(
+            total=100,
+            unit="%",
+            desc=f"EnergyPlus #{self.idf.position}-{self.idf.name}",
+            position=self.idf.position,
+        ) as progress, self.manifest.stage("EnergyPlus"):
+            self.p = subprocess.Popen(
+                self.cmd,
+                shell=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            start_time = time.time()
+            self.msg_callback("Simulation started")
+            self.idf._energyplus_its = 0  # reset counter
+            for line in self.p.stdout:
+                event = self.line_callback(line.decode("utf-8").rstrip("\r\n"))
+                if event is not None and event.percent is not None:
+                    progress.update(event.percent - progress.n)
+
+            # We explicitly close stdout
+            self.p.stdout.close()
 
+            # Wait for process to complete
+            self.peak_rss = wait_peak_rss(self.p)
+
+        self.exit_callback(start_time)
+
+    async def run_async(self, timeout=None):
+        """Same as :meth:`run`, but EnergyPlus is run as an asyncio subprocess
+        on the running event loop instead of in this thread.
+
+        The thread does not need to be started. If the task is cancelled or if
+        `timeout` elapses, EnergyPlus is killed and the exception is propagated.
+
+        Args:
+            timeout (float, optional): Number of seconds after which EnergyPlus is
+                killed and :class:`asyncio.TimeoutError` is raised.
+        """
+        self.cancelled = False
+        if not self.prepare():
+            return
+
+        start_time = time.time()
+        self.msg_callback("Simulation started")
+        self.idf._energyplus_its = 0  # reset counter
+        try:
+            with self.manifest.stage("EnergyPlus"):
+                self.p, self.std_err = await run_process_async(
+                    self.cmd, msg_callback=self.line_callback, timeout=timeout
+                )
+        except BaseException:
+            self.cancelled = True
+            self.exit_callback(start_time)
+            raise
+        self.exit_callback(start_time)
+
+    def prepare(self):
+        """Move the input files to the run directory and build the command.
+
+        Returns:
+            bool: False if the command could not be built, in which case the
+            error is stored in :attr:`exception`.
+        """
+        # get version from IDF object or by parsing the IDF file for it
         tmp = self.tmp
         self.epw = self.idf.epw.copy(tmp).expand()
         self.idfname = Path(self.idf.savecopy(tmp / self.idf.name)).expand()
         self.idd = self.idf.iddname.copy(tmp).expand()
         self.run_dir = Path(tmp).expand()
         self.include = [Path(file).copy(tmp) for file in self.idf.include]
+        self.parser = EnergyPlusOutputParser(
+            run_period=None if self.idf.annual else _run_period(self.idf)
+        )
 
         # build a list of command line arguments
         try:
@@ -199,64 +283,80 @@ class EnergyPlusThread(Thread):
             ).cmd()
         except EnergyPlusVersionError as e:
             self.exception = e
-            return
-
-        # Start process with tqdm bar
-        with tqdm(
-            unit_scale=True,
-            total=self.idf.energyplus_its if self.idf.energyplus_its > 0 else None,
-            miniters=1,
-            desc=f"EnergyPlus #{self.idf.position}-{self.idf.name}",
-            position=self.idf.position,
-        ) as progress:
-            self.p = subprocess.Popen(
-                self.cmd,
-                shell=False,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            start_time = time.time()
-            self.msg_callback("Simulation started")
-            self.idf._energyplus_its = 0  # reset counter
-            for line in self.p.stdout:
-                self.msg_callback(line.decode("utf-8").strip("\n"))
-                self.idf._energyplus_its += 1
-                progress.update()
-
-            # We explicitly close stdout
-            self.p.stdout.close()
-
-            # Wait for process to complete
-            self.p.wait()
-
-            # Communicate callbacks
-            if self.cancelled:
-                self.msg_callback("Simulation cancelled")
-                self.cancelled_callback(self.std_out, self.std_err)
-            else:
-                if self.p.returncode == 0:
-                    self.msg_callback(
-                        "EnergyPlus Completed in {:,.2f} seconds".format(
-                            time.time() - start_time
-                        )
+            return False
+        return True
+
+    def exit_callback(self, start_time):
+        """Communicate callbacks once the EnergyPlus process has exited."""
+        if self.cancelled:
+            self.msg_callback("Simulation cancelled")
+            self.cancelled_callback(self.std_out, self.std_err)
+        else:
+            if self.p.returncode == 0:
+                self.msg_callback(
+                    "EnergyPlus Completed in {:,.2f} seconds".format(
+                        time.time() - start_time
                     )
+                )
+                if self.peak_rss is not None:
+                    self.record_peak_rss()
+                with self.manifest.stage("publish"):
                     self.success_callback()
-                else:
-                    self.msg_callback("Simulation failed")
-                    self.failure_callback()
+            else:
+                self.msg_callback("Simulation failed")
+                self.failure_callback()
 
     def msg_callback(self, *args, **kwargs):
         log(*args, name=self.idf.name, **kwargs)
 
+    def line_callback(self, line):
+        """Parse a line of the standard output of EnergyPlus.
+
+        Only the lines parsed into a :class:`SimulationEvent` are logged. The
+        event is also passed to the :attr:`IDF.event_callbacks` of the model.
+
+        Args:
+            line (str): The line.
+
+        Returns:
+            SimulationEvent: The event, or None if the line is not an event.
+        """
+        self.idf._energyplus_its += 1
+        event = self.parser.parse(line)
+        if event is not None:
+            self.msg_callback(event.message, lg.ERROR if event.kind == ERROR else None)
+            for callback in self.idf.event_callbacks or []:
+                callback(self.idf, event)
+        return event
+
+    def record_peak_rss(self):
+        """Record the peak memory of EnergyPlus in the run manifest and in the
+        :class:`~archetypal.memory.MemoryHistory` used to estimate the memory
+        cost of the next runs of the model."""
+        self.manifest.stages["EnergyPlus"]["peak_rss"] = self.peak_rss
+        self.msg_callback(
+            f"EnergyPlus peak memory: {self.peak_rss / 1024 ** 2:,.0f} MiB", lg.DEBUG
+        )
+        original = self.idf.original_idfname
+        if isinstance(original, str) and os.path.isfile(original):
+            get_memory_history().record(original, self.peak_rss)
+
     def success_callback(self):
         save_dir = self.idf.simulation_dir
         if self.idf.keep_data:
             save_dir.rmtree_p()  # purge target dir
-            self.run_dir.copytree(save_dir)  # copy files
+            save_dir.makedirs_p()
+            # move the retained files, including those of subdirectories, to the
+            # same relative path; the others are deleted with the run_dir
+            for file in self.run_dir.walkfiles():
+                if retained(file.basename(), self.idf.keep):
+                    dst = save_dir / self.run_dir.relpathto(file)
+                    dst.dirname().makedirs_p()
+                    move_or_copy(file, dst)
 
             log(
                 "Files generated at the end of the simulation: %s"
-                % "\n".join(save_dir.files()),
+                % "\n".join(save_dir.walkfiles()),
                 lg.DEBUG,
                 name=self.name,
             )
@@ -291,3 +391,41 @@ class EnergyPlusThread(Thread):
             )
         else:
             return Path(eplus_home)
+
+
+def retained(filename, keep):
+    """bool: True if `filename` matches the retention policy `keep`.
+
+    Files of subdirectories are matched on their name alone.
+
+    Args:
+        filename (str): The name of an output file.
+        keep (list of str or None): File extensions (e.g. "sql" or ".sql") or
+            glob patterns (e.g. "*out.sql"). If None, all files are retained.
+    """
+    if keep is None:
+        return True
+    return any(fnmatch(filename, _keep_pattern(pattern)) for pattern in keep)
+
+
+def _keep_pattern(pattern):
+    """The glob pattern of a retention policy entry: "sql" and ".sql" are both
+    read as "*.sql"."""
+    if pattern.startswith("."):
+        return f"*{pattern}"
+    if not set(pattern) & set("*?[."):
+        return f"*.{pattern}"
+    return pattern
+
+
+def _run_period(idf):
+    """The ((month, day), (month, day)) bounds of the first run period of `idf`, or
+    None if it has none."""
+    try:
+        run_period = idf.idfobjects["RUNPERIOD"][0]
+        return (
+            (int(run_period.Begin_Month), int(run_period.Begin_Day_of_Month)),
+            (int(run_period.End_Month), int(run_period.End_Day_of_Month)),
+        )
+    except (IndexError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,171 @@
+"""Structured events parsed from the standard output of EnergyPlus and timing of
+the stages of a simulation."""
+
+import contextlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+
+# Kinds of simulation events
+WARMUP = "warmup"
+SIZING = "sizing"
+ENVIRONMENT = "environment"
+PROGRESS = "progress"
+ERROR = "error"
+COMPLETED = "completed"
+
+# Name of the run manifest saved in the simulation directory
+MANIFEST = "run_manifest.json"
+
+
+class SimulationEvent(
+    namedtuple("SimulationEvent", ["kind", "message", "environment", "percent"])
+):
+    """An event of a running EnergyPlus simulation.
+
+    Attributes:
+        kind (str): One of "warmup", "sizing", "environment" (an environment,
+            e.g. a run period or a design day, starts), "progress", "error" and
+            "completed".
+        message (str): The line of the standard output.
+        environment (str): The name of the current environment, if known.
+        percent (float): Percentage of the run period done, or None if the
+            current environment is not a run period.
+    """
+
+    __slots__ = ()
+
+
+class EnergyPlusOutputParser:
+    """Parse the standard output of EnergyPlus, line by line, into
+    :class:`SimulationEvent` objects.
+
+    Args:
+        run_period (tuple, optional): The ((month, day), (month, day)) bounds of
+            the run period, used to compute the percentage of the run period
+            done. Defaults to the whole year.
+    """
+
+    _starting = re.compile(
+        r"^\s*(Starting|Continuing) Simulation at (\d+)/(\d+)(/\d+)? for (.*?)\s*$"
+    )
+    _warmup = re.compile(r"^\s*Warming up")
+    _sizing = re.compile(r"sizing", re.IGNORECASE)
+    _error = re.compile(r"\*\*\s*(FATAL|SEVERE)|Terminated--Error", re.IGNORECASE)
+    _completed = re.compile(r"EnergyPlus Completed Successfully")
+
+    def __init__(self, run_period=None):
+        if run_period is None:
+            run_period = ((1, 1), (12, 31))
+        (begin_month, begin_day), (end_month, end_day) = run_period
+        self.begin = _day_of_year(begin_month, begin_day)
+        self.length = (_day_of_year(end_month, end_day) - self.begin) % 365 + 1
+        self.environment = None
+        self.percent = None
+
+    def parse(self, line):
+        """Parse a line of the standard output.
+
+        Args:
+            line (str): The line.
+
+        Returns:
+            SimulationEvent: The event, or None if the line is not an event.
+        """
+        match = self._starting.match(line)
+        if match:
+            starting, month, day, year, environment = match.groups()
+            self.environment = environment
+            # Design days are reported without a year since EnergyPlus 9.0
+            if year is not None or environment.upper().startswith("RUN PERIOD"):
+                day_of_year = _day_of_year(int(month), int(day))
+                self.percent = round(
+                    100 * ((day_of_year - self.begin) % 365) / self.length, 1
+                )
+            else:
+                self.percent = None
+            kind = ENVIRONMENT if starting == "Starting" else PROGRESS
+            return self._event(kind, line)
+        if self._error.search(line):
+            return self._event(ERROR, line)
+        if self._warmup.match(line):
+            return self._event(WARMUP, line)
+        if self._sizing.search(line):
+            return self._event(SIZING, line)
+        if self._completed.search(line):
+            self.percent = 100.0
+            return self._event(COMPLETED, line)
+        return None
+
+    def _event(self, kind, line):
+        return SimulationEvent(kind, line.strip(), self.environment, self.percent)
+
+
+def _day_of_year(month, day):
+    """Day of the year, starting at 0, of a non-leap year."""
+    day = min(day, 28) if month == 2 else day
+    return date(2001, month, day).timetuple().tm_yday - 1
+
+
+class RunManifest:
+    """Wall and CPU times of the stages of a simulation.
+
+    The CPU time of a stage includes the CPU time of the programs it waited for.
+    Since it is measured for the whole Python process, it is only exact when
+    the simulations are not run concurrently in threads of a same process.
+
+    Args:
+        name (str): The name of the model.
+        sim_id (str, optional): The id of the simulation.
+    """
+
+    def __init__(self, name, sim_id=None):
+        self.name = name
+        self.sim_id = sim_id
+        self.started = datetime.now()
+        self.stages = OrderedDict()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time the code run in this context as the stage `name`. The times of a
+        stage timed more than once are added up.
+
+        Args:
+            name (str): The name of the stage, e.g. "EnergyPlus".
+        """
+        wall_time, cpu_time = time.perf_counter(), _cpu_time()
+        try:
+            yield
+        finally:
+            record = self.stages.setdefault(name, dict(wall_time=0.0, cpu_time=0.0))
+            record["wall_time"] += time.perf_counter() - wall_time
+            record["cpu_time"] += _cpu_time() - cpu_time
+
+    def to_dict(self):
+        """dict: The manifest as a json serializable dict."""
+        return dict(
+            name=self.name,
+            sim_id=self.sim_id,
+            started=self.started.isoformat(),
+            wall_time=sum(stage["wall_time"] for stage in self.stages.values()),
+            cpu_time=sum(stage["cpu_time"] for stage in self.stages.values()),
+            stages=self.stages,
+        )
+
+    def save(self, path):
+        """Save the manifest to a json file.
+
+        Args:
+            path (str or Path): The path of the file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def _cpu_time():
+    """CPU time of this process and of its terminated child processes."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
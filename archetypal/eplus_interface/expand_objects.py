@@ -12,12 +12,26 @@ from eppy.runner.run_functions import paths_from_version
 from path import Path
 from tqdm import tqdm
 
+from archetypal import settings
+from archetypal.cache import get_preprocessor_cache
 from archetypal.eplus_interface.energy_plus import EnergyPlusProgram
 from archetypal.eplus_interface.exceptions import EnergyPlusVersionError
 from archetypal.eplus_interface.version import EnergyPlusVersion
 from archetypal.utils import log
 
 
+# Prefixes of the classes of the objects processed by ExpandObjects
+EXPANDED_OBJECTS = ("HVACTEMPLATE:", "GROUNDHEATTRANSFER:")
+
+
+def has_objects_to_expand(idf):
+    """bool: True if `idf` has objects processed by the ExpandObjects program."""
+    return any(
+        key.startswith(EXPANDED_OBJECTS) and len(idf.idfobjects[key]) > 0
+        for key in idf.model.dtls
+    )
+
+
 class ExpandObjectsExe(EnergyPlusProgram):
     """ExpandObject Wrapper"""
 
@@ -32,7 +46,15 @@ class ExpandObjectsExe(EnergyPlusProgram):
 
 
 class ExpandObjectsThread(Thread):
-    """ExpandObjects program manager."""
+    """ExpandObjects program manager.
+
+    The program is skipped if the model has no HVACTemplate or
+    GroundHeatTransfer objects. When `settings.use_cache` is True, its outputs
+    are cached keyed on the content of the model.
+    """
+
+    # Cached outputs of the program
+    OUTPUTS = ["expanded.idf", "GHTIn.idf", "BasementGHTIn.idf"]
 
     def __init__(self, idf, tmp):
         """Constructor."""
@@ -47,12 +69,19 @@ class ExpandObjectsThread(Thread):
         self.name = "ExpandObjects_" + self.idf.name
         self.tmp = tmp
         self.cmd = None
+        self.cache_key = None
 
     def run(self):
         """Wrapper around the EnergyPlus command line interface."""
         try:
             self.cancelled = False
             # get version from IDF object or by parsing the IDF file for it
+            if not has_objects_to_expand(self.idf):
+                self.msg_callback(
+                    "No HVACTemplate or GroundHeatTransfer objects; skipping "
+                    "ExpandObjects"
+                )
+                return
 
             # Move files into place
             tmp = self.tmp
@@ -64,6 +93,21 @@ class ExpandObjectsThread(Thread):
             ).copy2(tmp)
             self.run_dir = Path(tmp).expand()
 
+            # Reuse the outputs of a previous run with the same inputs
+            if settings.use_cache:
+                from archetypal.idfclass.util import hash_model
+
+                self.cache_key = hash_model(
+                    self.idfname,
+                    ep_version=self.idf.as_version,
+                    program="ExpandObjects",
+                )
+                if get_preprocessor_cache().restore(self.cache_key, self.run_dir):
+                    self.msg_callback(f"ExpandObjects cache hit '{self.cache_key}'")
+                    self.success_callback()
+                    return
+                self.msg_callback(f"ExpandObjects cache miss '{self.cache_key}'")
+
             # Run ExpandObjects Program
             self.cmd = ExpandObjectsExe(self.idf).cmd
             with tqdm(
@@ -102,6 +146,10 @@ class ExpandObjectsThread(Thread):
                             f"ExpandObjects completed in "
                             f"{time.time() - start_time:,.2f} seconds"
                         )
+                        if self.cache_key is not None:
+                            get_preprocessor_cache().put(
+                                self.cache_key, self.run_dir, files=self.OUTPUTS
+                            )
                         self.success_callback()
                     else:
                         self.failure_callback()
@@ -10,6 +10,8 @@ from eppy.runner.run_functions import paths_from_version
 from path import Path
 from tqdm import tqdm
 
+from archetypal import settings
+from archetypal.cache import get_preprocessor_cache
 from archetypal.eplus_interface.energy_plus import EnergyPlusProgram
 from archetypal.eplus_interface.exceptions import (
     EnergyPlusProcessError,
@@ -26,8 +28,13 @@ class SlabThread(Thread):
     EnergyPlus distribution. It requires an input file named GHTin.idf in
     input data file format. The needed corresponding idd file is
     SlabGHT.idd. An EnergyPlus weather file for the location is also needed.
+
+    When `settings.use_cache` is True, the outputs are cached keyed on the
+    content of GHTIn.idf and of the weather file.
     """
 
+    OUTPUTS = ["SLABSurfaceTemps.txt"]  # Cached outputs of the program
+
     def __init__(self, idf, tmp):
         """Constructor."""
         super(SlabThread, self).__init__()
@@ -40,6 +47,7 @@ class SlabThread(Thread):
         self.exception = None
         self.name = "RunSlab_" + self.idf.name
         self.include = None
+        self.cache_key = None
 
     @property
     def cmd(self):
@@ -52,6 +60,12 @@ class SlabThread(Thread):
         self.cancelled = False
         # get version from IDF object or by parsing the IDF file for it
 
+        # The GHTin.idf file is copied from the self.include list (added by
+        # ExpandObjects). If there is no GHTIn.idf, no need to run Slab.
+        if "GHTIn.idf" not in [Path(file).basename() for file in self.idf.include]:
+            self.cleanup_callback()
+            return
+
         # Move files into place
         self.epw = self.idf.epw.copy(self.run_dir / "in.epw").expand()
         self.idfname = Path(self.idf.idfname.copy(self.run_dir / "in.idf")).expand()
@@ -66,12 +80,23 @@ class SlabThread(Thread):
             self.eplus_home / "PreProcess" / "GrndTempCalc" / "SlabGHT.idd"
         ).copy(self.run_dir)
 
-        # The GHTin.idf file is copied from the self.include list (added by
-        # ExpandObjects. If self.include is empty, no need to run Slab.
         self.include = [Path(file).copy(self.run_dir) for file in self.idf.include]
-        if not self.include:
-            self.cleanup_callback()
-            return
+
+        # Reuse the outputs of a previous run with the same inputs
+        if settings.use_cache:
+            from archetypal.idfclass.util import hash_model
+
+            self.cache_key = hash_model(
+                self.run_dir / "GHTIn.idf",
+                epw=[self.epw],
+                ep_version=self.idf.as_version,
+                program="Slab",
+            )
+            if get_preprocessor_cache().restore(self.cache_key, self.run_dir):
+                self.msg_callback(f"RunSlab cache hit '{self.cache_key}'")
+                self.success_callback()
+                return
+            self.msg_callback(f"RunSlab cache miss '{self.cache_key}'")
 
         # Run Slab Program
         with tqdm(
@@ -111,6 +136,10 @@ class SlabThread(Thread):
                             time.time() - start_time
                         )
                     )
+                    if self.cache_key is not None:
+                        get_preprocessor_cache().put(
+                            self.cache_key, self.run_dir, files=self.OUTPUTS
+                        )
                     self.success_callback()
                     for line in self.p.stderr:
                         self.msg_callback(line.decode("utf-8"))
@@ -11,11 +11,14 @@ __all__ = [
     "Outputs",
     "Meters",
     "Variables",
+    "screening_copy",
+    "compare_screening",
 ]
 
 from .extensions import __eq__, _parse_idd_type, get_default, makedict, nameexists
 from .idf import IDF
 from .meters import Meters
 from .outputs import Outputs
+from .screening import compare_screening, screening_copy
 from .util import hash_model
 from .variables import Variables
@@ -20,9 +20,8 @@ def __eq__(self, other):
 @extend_class(EpBunch)
 def nameexists(self):
     """Return True if EpBunch Name already exists in idf.idfobjects[KEY]."""
-    existing_objs = self.theidf.idfobjects[self.key.upper()]
     try:
-        return self.Name.upper() in [obj.Name.upper() for obj in existing_objs]
+        return self.theidf.getobject(self.key.upper(), self.Name) is not None
     except BadEPFieldError:
         return False
 
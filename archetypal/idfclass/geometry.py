@@ -0,0 +1,185 @@
+"""Vectorized geometry of the surfaces of an IDF model."""
+
+import numpy as np
+import pandas as pd
+
+# Zone surfaces described by their vertices, with their implicit Surface_Type.
+ZONE_SURFACES = {
+    "BUILDINGSURFACE:DETAILED": None,
+    "WALL:DETAILED": "Wall",
+    "ROOFCEILING:DETAILED": "Roof",
+    "FLOOR:DETAILED": "Floor",
+}
+SUB_SURFACES = ["FENESTRATIONSURFACE:DETAILED"]
+
+COLUMNS = [
+    "Name",
+    "Key",
+    "Zone_Name",
+    "Building_Surface_Name",
+    "Surface_Type",
+    "Outside_Boundary_Condition",
+    "Multiplier",
+    "Part_of_Total_Floor_Area",
+    "area",
+    "tilt",
+    "azimuth",
+    "width",
+    "volume",
+]
+
+
+def get_geometry(idf):
+    """Compute the geometry of the detailed surfaces of the zones of `idf` in one
+    pass.
+
+    Vertices are grouped by number of vertices so that the area, tilt, azimuth
+    and width of all surfaces are computed with a few NumPy operations. Results
+    are the same as the per-surface functions of :mod:`eppy.geometry.surface`
+    used by the EpBunch `area`, `tilt`, `azimuth` and `width` attributes.
+
+    Args:
+        idf (IDF): The IDF model.
+
+    Returns:
+        pandas.DataFrame: One row per surface with the columns "Name", "Key",
+        "Zone_Name", "Building_Surface_Name" (subsurfaces only), "Surface_Type",
+        "Outside_Boundary_Condition", "Multiplier" (of the zone),
+        "Part_of_Total_Floor_Area" (of the zone), "area", "tilt", "azimuth",
+        "width" and "volume" (the contribution of the surface to the volume of
+        its zone, see :meth:`ZoneDefinition.get_volume_from_surfs`).
+    """
+    zones = {}
+    for zone in idf.idfobjects["ZONE"]:
+        multiplier = float(zone.Multiplier if zone.Multiplier != "" else 1)
+        part_of = zone.Part_of_Total_Floor_Area.upper() != "NO"
+        zones[zone.Name.upper()] = (multiplier, part_of)
+
+    rows, vertices = [], []
+    surface_zones = {}
+    for key, surface_type in ZONE_SURFACES.items():
+        for surface in idf.idfobjects.get(key, []):
+            zone_name = surface.Zone_Name
+            if zone_name.upper() not in zones:
+                continue
+            surface_zones[surface.Name.upper()] = zone_name
+            rows.append(
+                [
+                    surface.Name,
+                    key,
+                    zone_name,
+                    "",
+                    surface_type or surface.Surface_Type,
+                    surface.Outside_Boundary_Condition,
+                    *zones[zone_name.upper()],
+                ]
+            )
+            vertices.append(surface.coords)
+    for key in SUB_SURFACES:
+        for surface in idf.idfobjects.get(key, []):
+            base_surface = surface.Building_Surface_Name
+            zone_name = surface_zones.get(base_surface.upper())
+            if zone_name is None:
+                continue
+            rows.append(
+                [
+                    surface.Name,
+                    key,
+                    zone_name,
+                    base_surface,
+                    surface.Surface_Type,
+                    "",
+                    *zones[zone_name.upper()],
+                ]
+            )
+            vertices.append(surface.coords)
+
+    geometry = pd.DataFrame(rows, columns=COLUMNS[:8]).astype(
+        {"Multiplier": float, "Part_of_Total_Floor_Area": bool}
+    )
+    for column, values in polygon_properties(vertices).items():
+        geometry[column] = values
+    return geometry
+
+
+def polygon_properties(polygons):
+    """Compute the area, tilt, azimuth, width and volume of polygons.
+
+    Args:
+        polygons (list of list of tuple): The (x, y, z) vertices of each polygon.
+
+    Returns:
+        dict of numpy.ndarray: The properties, in the order of `polygons`.
+    """
+    n_polygons = len(polygons)
+    properties = {
+        name: np.full(n_polygons, np.nan)
+        for name in ["area", "tilt", "azimuth", "width", "volume"]
+    }
+    by_size = {}
+    for i, polygon in enumerate(polygons):
+        by_size.setdefault(len(polygon), []).append(i)
+    for size, indices in by_size.items():
+        if size == 0:
+            continue
+        pts = np.array([polygons[i] for i in indices], dtype=float)  # (m, n, 3)
+        for name, values in _polygon_properties(pts).items():
+            properties[name][indices] = values
+    return properties
+
+
+def _polygon_properties(pts):
+    """Properties of m polygons of n vertices given as an (m, n, 3) array."""
+    v0, v1, v_last = pts[:, 0], pts[:, 1 % pts.shape[1]], pts[:, -1]
+
+    # area, Newell's method projected on the normal of the first three vertices
+    total = np.cross(pts, np.roll(pts, -1, axis=1)).sum(axis=1)
+    if pts.shape[1] >= 3:
+        normal = _unit(np.cross(v1 - v0, pts[:, 2] - v0))
+    else:
+        normal = np.full_like(v0, np.nan)
+    # fall back on the polygon normal if the first three vertices are colinear
+    fallback = np.isnan(normal).any(axis=1)
+    normal[fallback] = _unit(total[fallback])
+    area = np.abs(np.einsum("ij,ij->i", total, normal)) / 2
+    area = np.nan_to_num(area) if pts.shape[1] >= 3 else np.zeros(len(pts))
+
+    # tilt and azimuth from the normal of the first, second and last vertices
+    normal = _unit(np.cross(v1 - v0, v_last - v0))
+    tilt = np.degrees(np.arccos(np.clip(normal[:, 2], -1, 1)))
+    horizontal = np.hypot(normal[:, 0], normal[:, 1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos_azimuth = np.where(horizontal == 0, 1, normal[:, 1] / horizontal)
+    azimuth = np.degrees(np.arccos(np.clip(cos_azimuth, -1, 1)))
+    azimuth = np.where(normal[:, 0] < 0, 360 - azimuth, azimuth)
+
+    # width, as in eppy.geometry.surface.width
+    dz_last = np.abs(v_last[:, 2] - v0[:, 2])
+    dz_first = np.abs(v1[:, 2] - v0[:, 2])
+    d_last = np.linalg.norm(v_last - v0, axis=1)
+    d_first = np.linalg.norm(v1 - v0, axis=1)
+    width = np.where(
+        dz_last < dz_first,
+        d_last,
+        np.where(dz_last > dz_first, d_first, np.maximum(d_last, d_first)),
+    )
+
+    # volume of the tetrahedrons formed by the origin and a triangle fan
+    # anchored on the first vertex (see ZoneDefinition.get_volume_from_surfs)
+    if pts.shape[1] >= 3:
+        a, b = pts[:, 1:-1], pts[:, 2:]
+        c = np.broadcast_to(v0[:, None, :], a.shape)
+        volume = np.abs(np.einsum("ijk,ijk->ij", a, np.cross(b, c))).sum(axis=1) / 6
+    else:
+        volume = np.zeros(len(pts))
+
+    return dict(area=area, tilt=tilt, azimuth=azimuth, width=width, volume=volume)
+
+
+def _unit(vectors):
+    """Normalize row vectors; vectors of (near) zero magnitude become NaN."""
+    magnitude = np.linalg.norm(vectors, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(
+            magnitude[:, None] < 1e-8, np.nan, vectors / magnitude[:, None]
+        )
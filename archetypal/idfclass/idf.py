@@ -6,14 +6,19 @@
 # Web: https://github.com/samuelduchesne/archetypal
 ################################################################################
 
+import asyncio
+import hashlib
 import itertools
 import logging as lg
 import os
+import pickle
 import re
-import sqlite3
+import shutil
 import subprocess
 import time
+import uuid
 import warnings
+import weakref
 from collections import defaultdict
 from io import StringIO
 from itertools import chain
@@ -21,20 +26,26 @@ from math import isclose
 from tempfile import TemporaryDirectory
 
 import eppy
+import numpy as np
 import pandas as pd
+from eppy import bunchhelpers, iddgaps
+from eppy.EPlusInterfaceFunctions import eplusdata
 from eppy.bunch_subclass import BadEPFieldError
 from eppy.easyopen import getiddfile
+from eppy.idfreader import convertallfields, convertfields
 from eppy.modeleditor import IDDNotSetError, namebunch, newrawobject
 from geomeppy import IDF as geomIDF
-from geomeppy.patches import EpBunch, idfreader1, obj2bunch
+from geomeppy.patches import EpBunch, Idf_MSequence, obj2bunch
 from pandas.errors import ParserError
 from path import Path
 from tqdm import tqdm
 
 from archetypal import ReportData, log, settings
+from archetypal.cache import get_simulation_cache
 from archetypal.energypandas import EnergySeries
 from archetypal.eplus_interface.basement import BasementThread
 from archetypal.eplus_interface.energy_plus import EnergyPlusThread
+from archetypal.eplus_interface.events import MANIFEST, RunManifest
 from archetypal.eplus_interface.exceptions import (
     EnergyPlusProcessError,
     EnergyPlusVersionError,
@@ -47,14 +58,34 @@ from archetypal.eplus_interface.version import (
     EnergyPlusVersion,
     get_eplus_dirs,
 )
+from archetypal.idfclass.geometry import (
+    SUB_SURFACES,
+    ZONE_SURFACES,
+    get_geometry,
+)
 from archetypal.idfclass.meters import Meters
 from archetypal.idfclass.outputs import Outputs
-from archetypal.idfclass.util import get_idf_version, hash_model
-from archetypal.idfclass.reports import get_report
+from archetypal.idfclass.util import (
+    file_digest,
+    get_idd_data,
+    get_idf_version,
+    hash_model,
+    objects_digest,
+)
+from archetypal.idfclass.reports import SqliteConnections, get_report
 from archetypal.idfclass.variables import Variables
+from archetypal.reportdata import ReportDataSidecar
 from archetypal.schedule import Schedule
 
 
+# Preprocessor programs run before EnergyPlus, with the prefix of their run folder.
+_PREPROCESSORS = [
+    ("ExpandObjects", "expandobjects_run_", ExpandObjectsThread),
+    ("Basement", "runBasement_run_", BasementThread),
+    ("Slab", "runSlab_run_", SlabThread),
+]
+
+
 class IDF(geomIDF):
     """Class for loading and parsing idf models and running simulations and
     retrieving results.
@@ -73,6 +104,9 @@ class IDF(geomIDF):
         "idfobjects": ["iddname", "idfname"],
         "block": ["iddname", "idfname"],
         "model": ["iddname", "idfname"],
+        "name_index": ["iddname", "idfname"],
+        "reference_classes": ["iddname", "idfname"],
+        "referring_fields": ["iddname", "idfname"],
         "sql": [
             "as_version",
             "annual",
@@ -111,9 +145,13 @@ class IDF(geomIDF):
             "annual",
             "design_day",
             "readvars",
+            "expandobjects",
             "as_version",
+            "keep",
         ],
         "schedules_dict": ["idfobjects"],
+        "geometry": ["idfobjects"],
+        "zone_geometries": ["idfobjects"],
         "partition_ratio": ["idfobjects"],
         "net_conditioned_building_area": ["idfobjects"],
         "energyplus_its": ["annual", "design_day"],
@@ -124,6 +162,32 @@ class IDF(geomIDF):
 
     _initial_postition = itertools.count(start=1)
 
+    _snapshot = None  # Parsed model waiting to be loaded, see from_snapshot()
+
+    # Attributes rebuilt lazily after unpickling, see __getstate__()
+    _transient_vars = [
+        "_idfobjects",
+        "_loaded_digests",
+        "_model",
+        "_block",
+        "_idd_info",
+        "_idd_index",
+        "_idd_version",
+        "_name_index",
+        "_reference_classes",
+        "_referring_fields",
+        "_geometry",
+        "_zone_geometries",
+        "_sql",
+        "_htm",
+        "_sql_connections",
+        "_sql_connections_finalizer",
+        "_schedules_dict",
+        "_schedules",
+        "_meters",
+        "_variables",
+    ]
+
     def _reset_dependant_vars(self, name):
         _reverse_dependencies = {}
         for k, v in self._dependencies.items():
@@ -171,12 +235,37 @@ class IDF(geomIDF):
         keep_data=True,
         keep_data_err=False,
         position=0,
+        load_only=None,
+        keep=None,
+        event_callbacks=None,
+        output_directory=None,
         **kwargs,
     ):
         """
         Args:
             idfname (str _TemporaryFileWrapper): The idf model filename.
             epw (str or Path): The weather-file
+            load_only (list of str, optional): Object classes to parse when the
+                model is loaded, e.g. ``["ZONE", "BUILDINGSURFACE:DETAILED"]``.
+                The whole file is still read to find these objects, but the
+                objects of the other classes are kept as raw text and their
+                fields are only split and converted the first time their class
+                is accessed, which cuts the load time and memory of large
+                models. If None, all classes are parsed.
+            keep (list of str, optional): Retention policy of the simulation
+                outputs, as file extensions or glob patterns, e.g. ``["sql",
+                "err", "htm"]``. Retained files, including those of
+                subdirectories, are moved to :attr:`simulation_dir` under the
+                same relative path and all other files are discarded,
+                except the run manifest ("run_manifest.json"), which is always
+                written. If None, all files are kept.
+            event_callbacks (list of callable, optional): Called with the model
+                and each :class:`~archetypal.eplus_interface.events.SimulationEvent`
+                (warmup, sizing, environment, progress, error, completed) parsed
+                from the output of EnergyPlus while it runs.
+            output_directory (str or Path, optional): The folder of the model and
+                of its simulation outputs. If None, a folder of
+                ``settings.cache_folder`` named after the hash of the model.
 
         EnergyPlus args:
             tmp_dir=None,
@@ -206,24 +295,36 @@ class IDF(geomIDF):
         self.prep_outputs = prep_outputs
         self._position = position
         self.output_prefix = None
+        self.load_only = load_only
+        self.keep = keep
+        self.event_callbacks = event_callbacks if event_callbacks is not None else []
 
         # Set dependants to None
-        self._output_directory = None
+        self._output_directory = Path(output_directory) if output_directory else None
         self._file_version = None
         self._iddname = None
         self._idd_info = None
         self._idd_index = None
         self._idd_version = None
         self._idfobjects = None
+        self._loaded_digests = None
+        self._source_digest = None
         self._block = None
         self._model = None
+        self._name_index = None
+        self._reference_classes = None
+        self._referring_fields = None
         self._sql = None
+        self._sql_connections = None
+        self._sql_connections_finalizer = None
         self._sql_file = None
         self._htm = None
         self._original_ep_version = None
         self._schedules_dict = None
         self._outputs = None
         self._partition_ratio = None
+        self._geometry = None
+        self._zone_geometries = None
         self._area_conditioned = None
         self._area_unconditioned = None
         self._area_total = None
@@ -290,7 +391,8 @@ class IDF(geomIDF):
     def read(self):
         """Read the IDF file and the IDD file.
 
-        If the IDD file had already been read, it will not be read again.
+        The IDD file is parsed only once per process and version; see
+        :func:`~archetypal.idfclass.util.get_idd_data`.
 
         Read populates the following data structures:
             - idfobjects : list
@@ -304,11 +406,192 @@ class IDF(geomIDF):
                 "Set it using IDF.setiddname(iddfile)"
             )
             raise IDDNotSetError(errortxt)
-        readout = idfreader1(
-            self.idfname, self.iddname, self, commdct=self.idd_info, block=self.block
+        self._read_model()
+
+    def _read_model(self):
+        """Parse the idf file using the shared IDD cache and set the model
+        attributes (idfobjects, model, block, idd_info, idd_index, idd_version).
+
+        If a fresh snapshot of the file exists (see :meth:`to_snapshot`), the
+        parsed objects are loaded from it instead of parsing the text.
+        """
+        block, idd_info, idd_index, idd_version = get_idd_data(self.iddname)
+        snapshot, self._snapshot = self._snapshot, None
+        if snapshot is None:
+            # The objects are read from the file; see content_digest()
+            self._source_digest = file_digest(self.idfname)[0]
+        if snapshot is None and settings.use_cache:
+            snapshot = self._read_snapshot(self._snapshot_file())
+        eager, deferred = None, None
+        if self.load_only is not None:
+            eager = {key.upper() for key in self.load_only}
+        if snapshot is not None and snapshot["idd_version"] == idd_version:
+            data = eplusdata.Eplusdata()
+            data.dt, data.dtls = snapshot["dt"], snapshot["dtls"]
+        else:
+            snapshot = None
+            if eager is None:
+                data = eplusdata.Eplusdata(eplusdata.Idd(block, 2), self.idfname)
+            else:
+                data = eplusdata.Eplusdata(eplusdata.Idd(block, 2))
+                deferred = _read_objects(self.idfname, data, eager)
+            convertallfields(data, idd_info)
+        # fill gaps in idd
+        skiplist = ["TABLE:MULTIVARIABLELOOKUP"] if idd_version < (8,) else None
+        nofirstfields = iddgaps.missingkeys_standard(
+            idd_info, data.dtls, skiplist=skiplist
+        )
+        iddgaps.missingkeys_nonstandard(block, idd_info, data.dtls, nofirstfields)
+        self._block = block
+        self._idd_info = idd_info
+        self._idd_index = idd_index
+        self._idd_version = idd_version
+        self._model = data
+        self._loaded_digests = {} if self._source_digest is not None else None
+        self._idfobjects = _makebunches(data, idd_info, self, deferred, eager)
+        if (
+            snapshot is None
+            and eager is None
+            and settings.use_cache
+            and not isinstance(self.idfname, StringIO)
+        ):
+            self.to_snapshot()
+
+    def _snapshot_file(self):
+        """Path: The default snapshot file of the idf file, keyed on its content
+        and on the IDD used to parse it."""
+        if isinstance(self.idfname, StringIO):
+            return None
+        key = hash_model(self.idfname, iddname=str(self.iddname))
+        return settings.cache_folder / "snapshots" / f"{key}.pkl"
+
+    @staticmethod
+    def _read_snapshot(filename):
+        if filename is None or not filename.exists():
+            return None
+        try:
+            with open(filename, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            log(f"could not load snapshot '{filename}': {e}", lg.WARNING)
+            return None
+        log(f"loaded parsed model from snapshot '{filename}'", lg.DEBUG)
+        return snapshot
+
+    def to_snapshot(self, filename=None):
+        """Serialize the parsed model to a binary snapshot file.
+
+        Loading a snapshot skips the text parsing of the idf file, which is the
+        bulk of the time spent opening large models. When `settings.use_cache`
+        is True, snapshots are written and picked up automatically by
+        :class:`IDF`; they are keyed on the content of the idf file (see
+        :func:`~archetypal.idfclass.util.hash_model`) so a snapshot is never
+        used once the file has changed.
+
+        Args:
+            filename (str or Path, optional): The snapshot file. Defaults to a
+                file named after the hash of the idf file in
+                `settings.cache_folder / "snapshots"`.
+
+        Returns:
+            Path: The snapshot file.
+        """
+        filename = Path(filename or self._snapshot_file()).expand()
+        snapshot = self._get_snapshot()
+        filename.dirname().makedirs_p()
+        tmp = filename.dirname() / f".{filename.basename()}-{uuid.uuid4().hex}"
+        with open(tmp, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, filename)
+        return filename
+
+    @classmethod
+    def from_snapshot(cls, filename, idfname=None, **kwargs):
+        """Create an IDF from a snapshot written by :meth:`to_snapshot`.
+
+        Args:
+            filename (str or Path): The snapshot file.
+            idfname (str or Path, optional): The idf file the snapshot was taken
+                from. Defaults to the path recorded in the snapshot.
+            **kwargs: Keyword arguments passed to :class:`IDF`.
+
+        Returns:
+            IDF: The IDF model.
+        """
+        snapshot = cls._read_snapshot(Path(filename).expand())
+        if snapshot is None:
+            raise FileNotFoundError(f"no snapshot could be read from '{filename}'")
+        idf = cls.__new__(cls)
+        idf._snapshot = snapshot
+        idf.__init__(idfname or snapshot["idfname"], **kwargs)
+        return idf
+
+    def content_digest(self):
+        """Return the md5 digest of the content of the parsed model.
+
+        As long as its objects are unchanged since they were read, the digest
+        is that of the idf file the model was read from (see
+        :func:`~archetypal.idfclass.util.file_digest`), so that a model hashes
+        the same whether it was parsed or not. Otherwise, it is the digest of
+        the field values of its objects.
+
+        Returns:
+            bytes: The digest.
+        """
+        if self._is_unchanged():
+            return self._source_digest
+        hasher = hashlib.md5()
+        for key in self.model.dtls:
+            hasher.update(objects_digest(self.idfobjects[key.upper()].list2))
+        return hasher.digest()
+
+    def _is_unchanged(self):
+        """bool: True if the objects are the ones read from the idf file. Classes
+        not materialized yet (see `load_only`) are unchanged."""
+        objects = self.idfobjects
+        if self._source_digest is None or self._loaded_digests is None:
+            return False
+        pending = getattr(objects, "_pending", ())
+        return all(
+            self._loaded_digests.get(key)
+            == objects_digest(dict.__getitem__(objects, key).list2)
+            for key in objects
+            if key not in pending
+        )
+
+    def _get_snapshot(self):
+        return dict(
+            idfname=None if isinstance(self.idfname, StringIO) else str(self.idfname),
+            idd_version=self.idd_version,
+            dtls=self.model.dtls,
+            dt=self.model.dt,
         )
-        (self.idfobjects, block, self.model, idd_info, idd_index, idd_version) = readout
-        self.setidd(idd_info, idd_index, block, idd_version)
+
+    def __getstate__(self):
+        """Return the state of the model for pickling.
+
+        Only the constructor arguments and the model itself are kept: the path of
+        the idf file if the model was not parsed yet, or the parsed objects as a
+        snapshot (see :meth:`to_snapshot`), so that changes made in memory are
+        preserved. The EpBunch objects, the IDD data and the cached simulation
+        results are left out and rebuilt lazily after unpickling, which makes
+        an IDF cheap to send to the workers of a ProcessPoolExecutor (see
+        :func:`~archetypal.utils.run_batch`).
+        """
+        state = self.__dict__.copy()
+        if self._idfobjects is not None:
+            state["_snapshot"] = self._get_snapshot()
+            if not self._is_unchanged():
+                state["_source_digest"] = None
+        for var in self._transient_vars:
+            state[var] = None
+        state["event_callbacks"] = []  # callbacks run in the parent process only
+        return state
+
+    def __setstate__(self, state):
+        """Restore the state returned by :meth:`__getstate__`. The model is parsed
+        again the first time it is accessed."""
+        self.__dict__.update(state)
 
     def getiddname(self):
         """Get the name of the current IDD used by eppy."""
@@ -330,90 +613,42 @@ class IDF(geomIDF):
     def block(self):
         """EnergyPlus field ID names of the IDF from the IDD."""
         if self._block is None:
-            bunchdt, block, data, commdct, idd_index, versiontuple = idfreader1(
-                self.idfname, self.iddname, self, commdct=None, block=None
-            )
-            self._block = block
-            self._idd_info = commdct
-            self._idd_index = idd_index
-            self._idfobjects = bunchdt
-            self._model = data
-            self._idd_version = versiontuple
+            self._read_model()
         return self._block
 
     @property
     def idd_info(self):
         """Descriptions of IDF fields from the IDD."""
         if self._idd_info is None:
-            bunchdt, block, data, commdct, idd_index, versiontuple = idfreader1(
-                self.idfname, self.iddname, self, commdct=None, block=None
-            )
-            self._block = block
-            self._idd_info = commdct
-            self._idd_index = idd_index
-            self._idfobjects = bunchdt
-            self._model = data
-            self._idd_version = versiontuple
+            self._read_model()
         return self._idd_info
 
     @property
     def idd_index(self):
         """A pair of dicts used for fast lookups of names of groups of objects."""
         if self._idd_index is None:
-            bunchdt, block, data, commdct, idd_index, versiontuple = idfreader1(
-                self.idfname, self.iddname, self, commdct=None, block=None
-            )
-            self._block = block
-            self._idd_info = commdct
-            self._idd_index = idd_index
-            self._idfobjects = bunchdt
-            self._model = data
-            self._idd_version = versiontuple
+            self._read_model()
         return self._idd_index
 
     @property
     def idfobjects(self):
         """Dict of lists of idf_MSequence objects in the IDF."""
         if self._idfobjects is None:
-            bunchdt, block, data, commdct, idd_index, versiontuple = idfreader1(
-                self.idfname, self.iddname, self, commdct=None, block=None
-            )
-            self._block = block
-            self._idd_info = commdct
-            self._idd_index = idd_index
-            self._idfobjects = bunchdt
-            self._model = data
-            self._idd_version = versiontuple
+            self._read_model()
         return self._idfobjects
 
     @property
     def model(self):
         """Eplusdata object containing representions of IDF objects."""
         if self._model is None:
-            bunchdt, block, data, commdct, idd_index, versiontuple = idfreader1(
-                self.idfname, self.iddname, self, commdct=None, block=None
-            )
-            self._block = block
-            self._idd_info = commdct
-            self._idd_index = idd_index
-            self._idfobjects = bunchdt
-            self._model = data
-            self._idd_version = versiontuple
+            self._read_model()
         return self._model
 
     @property
     def idd_version(self):
         """tuple: The version of the iddname."""
         if self._idd_version is None:
-            bunchdt, block, data, commdct, idd_index, versiontuple = idfreader1(
-                self.idfname, self.iddname, self, commdct=None, block=None
-            )
-            self._block = block
-            self._idd_info = commdct
-            self._idd_index = idd_index
-            self._idfobjects = bunchdt
-            self._model = data
-            self._idd_version = versiontuple
+            self._read_model()
         return self._idd_version
 
     @property
@@ -466,6 +701,31 @@ class IDF(geomIDF):
     def keep_data(self):
         return self._keep_data
 
+    @property
+    def keep(self):
+        """list of str: Extensions or glob patterns of the simulation outputs
+        retained in :attr:`simulation_dir`, e.g. "sql", ".sql" or "*out.sql".
+        Files of subdirectories are matched on their name and keep their
+        relative path. None retains all outputs. The run manifest
+        ("run_manifest.json", see
+        :class:`~archetypal.eplus_interface.events.RunManifest`) is always
+        retained.
+
+        Outputs read by this class, e.g. "sql" for :attr:`sql`, "htm" for
+        :attr:`htm` or "mdd" and "rdd" for :attr:`meters` and :attr:`variables`,
+        must be retained to be used.
+        """
+        return self._keep
+
+    @keep.setter
+    def keep(self, value):
+        if value is not None and (
+            not isinstance(value, (list, tuple))
+            or not all(isinstance(v, str) for v in value)
+        ):
+            raise TypeError("'keep' needs to be a list of str")
+        self._keep = value
+
     # region User-Defined Properties (have setter)
     @property
     def output_suffix(self):
@@ -671,21 +931,31 @@ class IDF(geomIDF):
 
         Based on a subset of hashed variables:
             - The idf model itself.
-            - epw
+            - The content of the epw and of the include files.
             - annual
             - design_day
             - readvars
+            - expandobjects
             - as_version
+            - keep (if set)
+
+        This id is also the key of the simulation results cache (see
+        :class:`~archetypal.cache.ResultCache`).
         """
         if self._sim_id is None:
+            keep = {}
+            if self.keep is not None:
+                keep["keep"] = ",".join(sorted(self.keep))
             self._sim_id = hash_model(
                 self,
-                epw=self.epw,
+                epw=[self.epw] if self.epw else [],
                 annual=self.annual,
                 design_day=self.design_day,
                 readvars=self.readvars,
+                expandobjects=self.expandobjects,
                 ep_version=self.as_version,
                 include=self.include,
+                **keep,
             )
         return self._sim_id
 
@@ -718,7 +988,12 @@ class IDF(geomIDF):
         return self.idfname.basename()
 
     def sql(self):
-        """Get the sql table report"""
+        """Get the sql table report.
+
+        Returns:
+            SqliteReport: A mapping of the tables of the sql file to DataFrames.
+            A table is only read the first time it is accessed.
+        """
         if self._sql is None:
             try:
                 sql_dict = get_report(
@@ -741,6 +1016,34 @@ class IDF(geomIDF):
                 self._sql = sql_dict
         return self._sql
 
+    @property
+    def sql_connections(self):
+        """SqliteConnections: Read-only connections to :attr:`sql_file`, one per
+        thread, shared by the queries of the model and of its template objects.
+
+        The connections are closed before the model is simulated again and when
+        the model is garbage collected.
+        """
+        sql_file = Path(self.sql_file).expand().abspath()
+        connections = self._sql_connections
+        if connections is None or connections.report_file != sql_file:
+            self.close_sql_connections()
+            connections = SqliteConnections(sql_file)
+            self._sql_connections_finalizer = weakref.finalize(
+                self, connections.close
+            )
+            self._sql_connections = connections
+        return connections
+
+    def close_sql_connections(self):
+        """Close the connections of :attr:`sql_connections`."""
+        if self._sql_connections_finalizer is not None:
+            self._sql_connections_finalizer.detach()
+            self._sql_connections_finalizer = None
+        if self._sql_connections is not None:
+            self._sql_connections.close()
+            self._sql_connections = None
+
     def htm(self):
         """Get the htm table report"""
         if self._htm is None:
@@ -841,30 +1144,14 @@ class IDF(geomIDF):
         """
         if self._area_conditioned is None:
             if self.simulation_dir.exists():
-                with sqlite3.connect(self.sql_file) as conn:
-                    sql_query = f"""
-                            SELECT t.Value
-                            FROM TabularDataWithStrings t
-                            WHERE TableName == 'Building Area' and ColumnName == 'Area' and RowName == 'Net Conditioned Building Area';"""
-                    (res,) = conn.execute(sql_query).fetchone()
-                self._area_conditioned = float(res)
+                self._area_conditioned = self.sql_connections.building_area(
+                    "Net Conditioned Building Area"
+                )
             else:
-                area = 0
-                zones = self.idfobjects["ZONE"]
-                zone: EpBunch
-                for zone in zones:
-                    for surface in zone.zonesurfaces:
-                        if hasattr(surface, "tilt"):
-                            if surface.tilt == 180.0:
-                                part_of = int(
-                                    zone.Part_of_Total_Floor_Area.upper() != "NO"
-                                )
-                                multiplier = float(
-                                    zone.Multiplier if zone.Multiplier != "" else 1
-                                )
-
-                                area += surface.area * multiplier * part_of
-                self._area_conditioned = area
+                floors = self._floors()
+                self._area_conditioned = (floors.area * floors.Multiplier)[
+                    floors.Part_of_Total_Floor_Area
+                ].sum()
         return self._area_conditioned
 
     @property
@@ -872,31 +1159,14 @@ class IDF(geomIDF):
         """Returns the Unconditioned Building Area"""
         if self._area_unconditioned is None:
             if self.simulation_dir.exists():
-                with sqlite3.connect(self.sql_file) as conn:
-                    sql_query = f"""
-                            SELECT t.Value
-                            FROM TabularDataWithStrings t
-                            WHERE TableName == 'Building Area' and 
-                            ColumnName == 'Area' and RowName == 'Unconditioned Building Area';"""
-                    (res,) = conn.execute(sql_query).fetchone()
-                self._area_unconditioned = float(res)
+                self._area_unconditioned = self.sql_connections.building_area(
+                    "Unconditioned Building Area"
+                )
             else:
-                area = 0
-                zones = self.idfobjects["ZONE"]
-                zone: EpBunch
-                for zone in zones:
-                    for surface in zone.zonesurfaces:
-                        if hasattr(surface, "tilt"):
-                            if surface.tilt == 180.0:
-                                part_of = int(
-                                    zone.Part_of_Total_Floor_Area.upper() == "NO"
-                                )
-                                multiplier = float(
-                                    zone.Multiplier if zone.Multiplier != "" else 1
-                                )
-
-                                area += surface.area * multiplier * part_of
-                self._area_unconditioned = area
+                floors = self._floors()
+                self._area_unconditioned = (floors.area * floors.Multiplier)[
+                    ~floors.Part_of_Total_Floor_Area
+                ].sum()
         return self._area_unconditioned
 
     @property
@@ -904,28 +1174,12 @@ class IDF(geomIDF):
         """"""
         if self._area_total is None:
             if self.simulation_dir.exists():
-                with sqlite3.connect(self.sql_file) as conn:
-                    sql_query = f"""
-                            SELECT t.Value
-                            FROM TabularDataWithStrings t
-                            WHERE TableName == 'Building Area' and 
-                            ColumnName == 'Area' and RowName == 'Total Building Area';"""
-                    (res,) = conn.execute(sql_query).fetchone()
-                self._area_total = float(res)
+                self._area_total = self.sql_connections.building_area(
+                    "Total Building Area"
+                )
             else:
-                area = 0
-                zones = self.idfobjects["ZONE"]
-                zone: EpBunch
-                for zone in zones:
-                    for surface in zone.zonesurfaces:
-                        if hasattr(surface, "tilt"):
-                            if surface.tilt == 180.0:
-                                multiplier = float(
-                                    zone.Multiplier if zone.Multiplier != "" else 1
-                                )
-
-                                area += surface.area * multiplier
-                self._area_total = area
+                floors = self._floors()
+                self._area_total = (floors.area * floors.Multiplier).sum()
         return self._area_total
 
     @property
@@ -934,29 +1188,71 @@ class IDF(geomIDF):
         in average in the building floor plan by m2.
         """
         if self._partition_ratio is None:
-            partition_lineal = 0
-            zones = self.idfobjects["ZONE"]
-            zone: EpBunch
-            for zone in zones:
-                for surface in [
-                    surf
-                    for surf in zone.zonesurfaces
-                    if surf.key.upper() not in ["INTERNALMASS", "WINDOWSHADINGCONTROL"]
-                ]:
-                    if hasattr(surface, "tilt"):
-                        if (
-                            surface.tilt == 90.0
-                            and surface.Outside_Boundary_Condition != "Outdoors"
-                        ):
-                            multiplier = float(
-                                zone.Multiplier if zone.Multiplier != "" else 1
-                            )
-                            partition_lineal += surface.width * multiplier
+            geometry = self.geometry
+            partitions = geometry[
+                geometry.Key.isin(ZONE_SURFACES)
+                & np.isclose(geometry.tilt, 90.0)
+                & (geometry.Outside_Boundary_Condition != "Outdoors")
+            ]
+            partition_lineal = (partitions.width * partitions.Multiplier).sum()
             self._partition_ratio = (
                 partition_lineal / self.net_conditioned_building_area
             )
         return self._partition_ratio
 
+    @property
+    def geometry(self):
+        """pandas.DataFrame: The geometry of the detailed surfaces of the zones.
+
+        One row per surface with its zone, type, boundary condition, zone
+        multiplier, area, tilt, azimuth and width (see
+        :func:`~archetypal.idfclass.geometry.get_geometry`). The table is computed
+        once, and again after objects are added or removed with the methods of
+        the model or the surfaces are moved with :meth:`translate`,
+        :meth:`rotate` or :meth:`scale`. Vertices edited directly on the surfaces
+        are not tracked.
+        """
+        if self._geometry is None:
+            self._geometry = get_geometry(self)
+        return self._geometry
+
+    def zone_geometry(self, zone_name):
+        """pandas.DataFrame: The rows of :attr:`geometry` for the detailed
+        surfaces of the zone `zone_name` (case insensitive).
+
+        The rows of all zones are grouped once, so that looking up each zone of
+        the model is linear in the number of surfaces.
+        """
+        if self._zone_geometries is None:
+            geometry = self.geometry
+            surfaces = geometry[geometry.Key.isin(ZONE_SURFACES)]
+            self._zone_geometries = dict(
+                list(surfaces.groupby(surfaces.Zone_Name.str.upper()))
+            )
+        return self._zone_geometries.get(zone_name.upper(), self.geometry.iloc[:0])
+
+    def translate(self, *args, **kwargs):
+        """Move the surfaces of the model (see :meth:`geomeppy.IDF.translate`)."""
+        super(IDF, self).translate(*args, **kwargs)
+        self._reset_dependant_vars("idfobjects")
+
+    def rotate(self, *args, **kwargs):
+        """Rotate the surfaces of the model (see :meth:`geomeppy.IDF.rotate`)."""
+        super(IDF, self).rotate(*args, **kwargs)
+        self._reset_dependant_vars("idfobjects")
+
+    def scale(self, *args, **kwargs):
+        """Scale the surfaces of the model (see :meth:`geomeppy.IDF.scale`)."""
+        super(IDF, self).scale(*args, **kwargs)
+        self._reset_dependant_vars("idfobjects")
+
+    def _floors(self):
+        """Surfaces of the geometry table facing down (tilt of 180 degrees)."""
+        geometry = self.geometry
+        return geometry[
+            geometry.Key.isin(ZONE_SURFACES) & np.isclose(geometry.tilt, 180.0)
+        ]
+
     @property
     def simulation_files(self):
         try:
@@ -1091,9 +1387,16 @@ class IDF(geomIDF):
                 self._variables = Variables(self)
         return self._variables
 
-    def simulate(self, **kwargs):
+    def simulate(self, screening=False, **kwargs):
         """Execute EnergyPlus. Does not return anything.
 
+        Args:
+            screening (bool): If True, simulate a copy of the model with the
+                coarser settings of the screening profile instead, and return the
+                simulated copy; the model itself is not modified. See
+                :func:`~archetypal.idfclass.screening.screening_copy` and
+                :func:`~archetypal.idfclass.screening.compare_screening`.
+
         Keyword Args:
             eplus_file (str): path to the idf file.
             weather_file (str): path to the EPW weather file.
@@ -1151,86 +1454,178 @@ class IDF(geomIDF):
             :meth:`simulation_files`, :meth:`processed_results` for simulation outputs.
 
         """
-        # First, update keys with new values
-        for key, value in kwargs.items():
-            if f"_{key}" in self.__dict__.keys():
-                setattr(self, key, value)
+        if screening:
+            from archetypal.idfclass.screening import simulate_screening
 
-        if self.as_version != EnergyPlusVersion(self.idd_version):
-            raise EnergyPlusVersionError(
-                None, self.idfname, EnergyPlusVersion(self.idd_version), self.as_version
-            )
+            return simulate_screening(self, **kwargs)
 
         start_time = time.time()
-        include = self.include
-        if isinstance(include, str):
-            include = Path().abspath().glob(include)
-        elif include is not None:
-            include = [Path(file) for file in include]
-
-        # check if a weather file is defined
-        if not getattr(self, "epw", None):
-            raise EnergyPlusWeatherError(
-                f"No weather file specified with {self}. Set 'epw' in IDF("
-                f"filename, epw='weather.epw').simulate() or in IDF.simulate("
-                f"epw='weather.epw')"
+        sim_id = self._start_simulation(**kwargs)
+        if sim_id is None:
+            log(
+                f"Retrieved cached simulation results for '{self.name}' in "
+                f"{time.time() - start_time:,.2f} seconds"
             )
+            return self
 
         # Todo: Add EpMacro Thread -> if exist in.imf "%program_path%EPMacro"
-        # Run the expandobjects program if necessary
-        with TemporaryDirectory(
-            prefix="expandobjects_run_",
-            suffix=None,
-            dir=self.output_directory,
-        ) as tmp:
-            # Run the ExpandObjects preprocessor program
-            expandobjects_thread = ExpandObjectsThread(self, tmp)
-            expandobjects_thread.start()
-            expandobjects_thread.join()
-            e = expandobjects_thread.exception
-            if e is not None:
-                raise e
+        # Run the ExpandObjects, Basement and Slab preprocessor programs if
+        # necessary
+        manifest = RunManifest(self.name, sim_id)
+        for name, prefix, preprocessor in _PREPROCESSORS:
+            with TemporaryDirectory(
+                prefix=prefix, suffix=None, dir=self._scratch_dir()
+            ) as tmp, manifest.stage(name):
+                thread = preprocessor(self, tmp)
+                thread.start()
+                thread.join()
+            if thread.exception is not None:
+                raise thread.exception
 
-        # Run the Basement preprocessor program if necessary
+        # Run the energyplus program
         with TemporaryDirectory(
-            prefix="runBasement_run_",
+            prefix="eplus_run_",
             suffix=None,
-            dir=self.output_directory,
+            dir=self._scratch_dir(),
         ) as tmp:
-            basement_thread = BasementThread(self, tmp)
-            basement_thread.start()
-            basement_thread.join()
-        e = basement_thread.exception
+            running_simulation_thread = EnergyPlusThread(self, tmp, manifest)
+            running_simulation_thread.start()
+            running_simulation_thread.join()
+        e = running_simulation_thread.exception
         if e is not None:
             raise e
 
-        # Run the Slab preprocessor program if necessary
-        with TemporaryDirectory(
-            prefix="runSlab_run_",
-            suffix=None,
-            dir=self.output_directory,
-        ) as tmp:
-            slab_thread = SlabThread(self, tmp)
-            slab_thread.start()
-            slab_thread.join()
-        e = slab_thread.exception
-        if e is not None:
-            raise e
+        self._publish_simulation(sim_id, manifest)
+        return self
+
+    async def simulate_async(self, timeout=None, **kwargs):
+        """Execute EnergyPlus from an asyncio event loop.
+
+        Same as :meth:`simulate`, but EnergyPlus is run with
+        :func:`asyncio.create_subprocess_exec` and its output is streamed on the
+        event loop, so that many simulations can be driven concurrently without
+        a thread per simulation (see :func:`~archetypal.utils.simulate_async_many`).
+        The short preprocessor programs run in the default executor of the loop.
+        If the task is cancelled or `timeout` elapses, EnergyPlus is killed.
+
+        Args:
+            timeout (float, optional): Number of seconds after which EnergyPlus is
+                killed and :class:`asyncio.TimeoutError` is raised.
+            **kwargs: Keyword arguments of :meth:`simulate`.
+
+        Returns:
+            IDF: The simulated model.
+        """
+        start_time = time.time()
+        sim_id = self._start_simulation(**kwargs)
+        if sim_id is None:
+            log(
+                f"Retrieved cached simulation results for '{self.name}' in "
+                f"{time.time() - start_time:,.2f} seconds"
+            )
+            return self
+
+        loop = asyncio.get_event_loop()
+        manifest = RunManifest(self.name, sim_id)
+        for name, prefix, preprocessor in _PREPROCESSORS:
+            with TemporaryDirectory(
+                prefix=prefix, suffix=None, dir=self._scratch_dir()
+            ) as tmp, manifest.stage(name):
+                thread = preprocessor(self, tmp)
+                await loop.run_in_executor(None, thread.run)
+            if thread.exception is not None:
+                raise thread.exception
 
-        # Run the energyplus program
         with TemporaryDirectory(
             prefix="eplus_run_",
             suffix=None,
-            dir=self.output_directory,
+            dir=self._scratch_dir(),
         ) as tmp:
-            running_simulation_thread = EnergyPlusThread(self, tmp)
-            running_simulation_thread.start()
-            running_simulation_thread.join()
-        e = running_simulation_thread.exception
+            running_simulation = EnergyPlusThread(self, tmp, manifest)
+            await running_simulation.run_async(timeout=timeout)
+        e = running_simulation.exception
         if e is not None:
             raise e
+
+        self._publish_simulation(sim_id, manifest)
         return self
 
+    def _start_simulation(self, **kwargs):
+        """Apply the simulation `kwargs` and check that the model can be
+        simulated.
+
+        Returns:
+            str or None: The :attr:`sim_id` of the simulation, or None if its
+            results were restored from the simulation cache.
+        """
+        # First, update keys with new values
+        for key, value in kwargs.items():
+            if f"_{key}" in self.__dict__.keys():
+                setattr(self, key, value)
+
+        # The sql file is about to be replaced
+        self.close_sql_connections()
+
+        if self.as_version != EnergyPlusVersion(self.idd_version):
+            raise EnergyPlusVersionError(
+                None, self.idfname, EnergyPlusVersion(self.idd_version), self.as_version
+            )
+
+        # check if a weather file is defined
+        if not getattr(self, "epw", None):
+            raise EnergyPlusWeatherError(
+                f"No weather file specified with {self}. Set 'epw' in IDF("
+                f"filename, epw='weather.epw').simulate() or in IDF.simulate("
+                f"epw='weather.epw')"
+            )
+
+        # Bypass EnergyPlus if the results of this exact simulation are cached
+        sim_id = self.sim_id
+        if settings.use_cache:
+            if get_simulation_cache().restore(sim_id, self.simulation_dir):
+                return None
+        return sim_id
+
+    def _scratch_dir(self):
+        """The directory in which the run directory of a simulation program is
+        created.
+
+        This is `settings.scratch_folder` (e.g. "/dev/shm") if it is set and has
+        at least `settings.scratch_min_free` bytes of free space. Otherwise, the
+        run directory spills over to :attr:`output_directory`.
+        """
+        scratch = settings.scratch_folder
+        if scratch is not None:
+            try:
+                free = shutil.disk_usage(scratch).free
+            except OSError:
+                free = 0
+            if free >= settings.scratch_min_free:
+                return Path(scratch)
+            log(
+                f"Not enough free space in the scratch folder '{scratch}'; "
+                f"running '{self.name}' in '{self.output_directory}'",
+                lg.WARNING,
+            )
+        return self.output_directory
+
+    def _publish_simulation(self, sim_id, manifest):
+        """Publish the results of the simulation `sim_id` to the cache and save
+        the run `manifest` in the simulation directory.
+
+        If `settings.report_sidecar` is True, the report data of the sql file is
+        first written to a :class:`~archetypal.reportdata.ReportDataSidecar`.
+        """
+        if settings.report_sidecar:
+            with manifest.stage("sidecar"):
+                for sql_file in self.simulation_dir.files("*out.sql"):
+                    ReportDataSidecar.write(sql_file)
+        with manifest.stage("publish"):
+            if settings.use_cache and self.simulation_dir.exists():
+                get_simulation_cache().put(sim_id, self.simulation_dir)
+        if self.simulation_dir.exists():
+            manifest.save(self.simulation_dir / MANIFEST)
+
     def savecopy(self, filename, lineendings="default", encoding="latin-1"):
         """Save a copy of the file with the filename passed.
 
@@ -1437,34 +1832,35 @@ class IDF(geomIDF):
             else:
                 return x
 
-        total_surface_area = defaultdict(int)
-        total_window_area = defaultdict(int)
-
-        zones = self.idfobjects["ZONE"]
-        zone: EpBunch
-        for zone in zones:
-            multiplier = float(zone.Multiplier if zone.Multiplier != "" else 1)
-            for surface in [
-                surf
-                for surf in zone.zonesurfaces
-                if surf.key.upper() not in ["INTERNALMASS", "WINDOWSHADINGCONTROL"]
-            ]:
-                if isclose(surface.tilt, 90, abs_tol=10):
-                    if surface.Outside_Boundary_Condition == "Outdoors":
-                        surf_azim = roundto(surface.azimuth, to=azimuth_threshold)
-                        total_surface_area[surf_azim] += surface.area * multiplier
-                for subsurface in surface.subsurfaces:
-                    if hasattr(subsurface, "tilt"):
-                        if isclose(subsurface.tilt, 90, abs_tol=10):
-                            if subsurface.Surface_Type.lower() == "window":
-                                surf_azim = roundto(
-                                    subsurface.azimuth, to=azimuth_threshold
-                                )
-                                total_window_area[surf_azim] += (
-                                    subsurface.area * multiplier
-                                )
-                        if isclose(subsurface.tilt, 180, abs_tol=80):
-                            total_window_area["sky"] += subsurface.area * multiplier
+        geometry = self.geometry
+        surfaces = geometry[geometry.Key.isin(ZONE_SURFACES)]
+        walls = surfaces[
+            np.isclose(surfaces.tilt, 90, rtol=0, atol=10)
+            & (surfaces.Outside_Boundary_Condition == "Outdoors")
+        ]
+        total_surface_area = defaultdict(
+            int,
+            (walls.area * walls.Multiplier)
+            .groupby(walls.azimuth.apply(roundto, to=azimuth_threshold))
+            .sum()
+            .to_dict(),
+        )
+
+        subsurfaces = geometry[geometry.Key.isin(SUB_SURFACES)]
+        windows = subsurfaces[
+            np.isclose(subsurfaces.tilt, 90, rtol=0, atol=10)
+            & (subsurfaces.Surface_Type.str.lower() == "window")
+        ]
+        total_window_area = defaultdict(
+            int,
+            (windows.area * windows.Multiplier)
+            .groupby(windows.azimuth.apply(roundto, to=azimuth_threshold))
+            .sum()
+            .to_dict(),
+        )
+        skylights = subsurfaces[np.isclose(subsurfaces.tilt, 180, rtol=0, atol=80)]
+        if not skylights.empty:
+            total_window_area["sky"] += (skylights.area * skylights.Multiplier).sum()
         # Fix azimuth = 360 which is the same as azimuth 0
         total_surface_area[0] += total_surface_area.pop(360, 0)
         total_window_area[0] += total_window_area.pop(360, 0)
@@ -1674,9 +2070,8 @@ class IDF(geomIDF):
             # If object is supposed to be 'unique-object', deletes all objects to be
             # sure there is only one of them when creating new object
             # (see following line)
-            if "unique-object" in set().union(
-                *(d.objidd[0].keys() for d in existing_objs)
-            ):
+            if existing_objs and "unique-object" in existing_objs[0].objidd[0]:
+                # objidd is shared by all the objects of a class
                 for obj in existing_objs:
                     self.removeidfobject(obj)
                     self.addidfobject(new_object)
@@ -1686,7 +2081,15 @@ class IDF(geomIDF):
                         lg.DEBUG,
                     )
                 return new_object
-            if new_object in existing_objs:
+            if new_object.objls[1:2] == ["Name"] and isinstance(new_object.Name, str):
+                # Named objects are found through the name index.
+                same_name = self.getobject(key, new_object.Name)
+                is_duplicate = same_name is not None and same_name == new_object
+                name_exists = same_name is not None
+            else:
+                is_duplicate = new_object in existing_objs
+                name_exists = not is_duplicate and new_object.nameexists()
+            if is_duplicate:
                 # If obj already exists, simply return
                 log(
                     f"object '{new_object}' already exists in {self.name}. "
@@ -1694,7 +2097,7 @@ class IDF(geomIDF):
                     lg.DEBUG,
                 )
                 return new_object
-            elif new_object not in existing_objs and new_object.nameexists():
+            elif name_exists:
                 obj = self.getobject(
                     key=new_object.key.upper(), name=new_object.Name.upper()
                 )
@@ -1723,7 +2126,38 @@ class IDF(geomIDF):
         """
         key = new_object.key.upper()
         self.idfobjects[key].append(new_object)
+        self._index_name(new_object)
+        self._reset_dependant_vars("idfobjects")
+
+    def copyidfobject(self, idfobject):
+        """Add a copy of an IDF object to the IDF.
+
+        Args:
+            idfobject (EpBunch): The IDF object to copy. This usually comes from
+                another idf file, or it can be used to copy within this idf file.
+
+        Returns:
+            EpBunch: The copy.
+        """
+        new_object = super(IDF, self).copyidfobject(idfobject)
+        self._index_name(new_object)
         self._reset_dependant_vars("idfobjects")
+        return new_object
+
+    def popidfobject(self, key, index):
+        """Pop an IDF object from the IDF.
+
+        Args:
+            key (str): The type of IDF object.
+            index (int): The index of the object to pop.
+
+        Returns:
+            EpBunch: The object.
+        """
+        idfobject = self.idfobjects[key.upper()].pop(index)
+        self._unindex_name(idfobject)
+        self._reset_dependant_vars("idfobjects")
+        return idfobject
 
     def removeidfobject(self, idfobject):
         """Remove an IDF object from the IDF.
@@ -1736,8 +2170,206 @@ class IDF(geomIDF):
         """
         key = idfobject.key.upper()
         self.idfobjects[key].remove(idfobject)
+        self._unindex_name(idfobject)
         self._reset_dependant_vars("idfobjects")
 
+    def getobject(self, key, name):
+        """Fetch an IDF object given its class and name.
+
+        Lookups use an index of the objects of each class by name (the first
+        field of the object), kept current by :meth:`addidfobject`,
+        :meth:`copyidfobject`, :meth:`removeidfobject`, :meth:`popidfobject`,
+        :meth:`rename` and :meth:`rename_many`. The current name of an indexed
+        object is checked, and a miss rebuilds the index of the class in one
+        scan, so that objects renamed directly (e.g. ``obj.Name = "X"``) are
+        found under their new name only.
+
+        Args:
+            key (str): The type of IDF object.
+            name (str): The name of the object to fetch.
+
+        Returns:
+            EpBunch: The object, or None if it does not exist.
+        """
+        key = key.upper()
+        name = name.upper()
+        built = key in (self._name_index or {})
+        obj = self._indexed_object(key, name)
+        if obj is None and built:
+            # Objects may have been renamed directly since the index was built
+            del self._name_index[key]
+            obj = self._indexed_object(key, name)
+        return obj
+
+    def _indexed_object(self, key, name):
+        """The first object of class `key` indexed under `name` and still named
+        `name`, or None."""
+        for obj in self._class_name_index(key).get(name, []):
+            if len(obj.obj) > 1 and str(obj.obj[1]).upper() == name:
+                return obj
+        return None
+
+    def get_all_referrers(self):
+        """Return the reverse-reference map of the model.
+
+        Maps each upper-cased name found in a field that references other
+        objects (a field with an `object-list` in the IDD) to the list of
+        (EpBunch, field index) where it is found.
+
+        The map is not cached: every object of the referring classes is
+        visited at each call, so that fields assigned directly and objects
+        added through eppy are reflected. Call it once and reuse the result
+        rather than calling it in a loop.
+
+        Returns:
+            dict: {NAME: [(EpBunch, int)]}.
+        """
+        referrers = {}
+        for key, fields in self.referring_fields.items():
+            for obj in self.idfobjects[key]:
+                for findex, _ in fields:
+                    value = obj.obj[findex] if findex < len(obj.obj) else None
+                    if isinstance(value, str) and value:
+                        referrers.setdefault(value.upper(), []).append((obj, findex))
+        return referrers
+
+    def get_referrers(self, name, object_lists=None):
+        """Return the objects referencing `name`.
+
+        The current field values of every object of the classes with a field
+        that can reference one of `object_lists` are scanned (see
+        :attr:`referring_fields`); there is no reverse-reference index.
+
+        Args:
+            name (str): The referenced name (case insensitive).
+            object_lists (set of str, optional): Only return references made by
+                fields whose IDD `object-list` is one of these (upper-cased).
+
+        Returns:
+            list of (EpBunch, int): The referring objects and field indices.
+        """
+        name = name.upper()
+        referrers = []
+        for key, fields in self.referring_fields.items():
+            findexes = [
+                findex
+                for findex, lists in fields
+                if object_lists is None or not lists.isdisjoint(object_lists)
+            ]
+            if not findexes:
+                continue
+            for obj in self.idfobjects[key]:
+                for findex in findexes:
+                    value = obj.obj[findex] if findex < len(obj.obj) else None
+                    if isinstance(value, str) and value.upper() == name:
+                        referrers.append((obj, findex))
+        return referrers
+
+    def get_referenced_object(self, referring_object, fieldname):
+        """Return the object referenced by a field of `referring_object`.
+
+        Same as :meth:`eppy.bunch_subclass.EpBunch.get_referenced_object`, but only
+        the classes that can be referenced by the field are searched, using the
+        name index (see :meth:`getobject`).
+
+        Args:
+            referring_object (EpBunch): The object which contains a reference to
+                another object.
+            fieldname (str): The name of the field in the referring object which
+                contains the reference to another object.
+
+        Returns:
+            EpBunch: The referenced object, or None if it does not exist.
+        """
+        name = referring_object[fieldname]
+        if not isinstance(name, str) or not name:
+            return None
+        object_lists = referring_object.getfieldidd_item(fieldname, "object-list")
+        for object_list in object_lists:
+            for key in self.reference_classes.get(object_list.upper(), []):
+                obj = self.getobject(key, name)
+                if obj is not None:
+                    return obj
+        return None
+
+    @property
+    def reference_classes(self):
+        """dict: The classes whose Name can be referenced by each object-list of
+        the IDD, e.g. {"ZONENAMES": ["ZONE"], ...}."""
+        if self._reference_classes is None:
+            reference_classes = {}
+            for key, objidd in zip(self.model.dtls, self.idd_info):
+                if len(objidd) > 1 and objidd[1].get("field") == ["Name"]:
+                    for reference in objidd[1].get("reference", []):
+                        reference_classes.setdefault(reference.upper(), []).append(
+                            key
+                        )
+            self._reference_classes = reference_classes
+        return self._reference_classes
+
+    @property
+    def referring_fields(self):
+        """dict: The fields of each class of the IDD that reference other
+        objects, e.g. {"PEOPLE": [(2, {"ZONEANDZONELISTNAMES"}), ...], ...}.
+
+        Each field is given by its index and the upper-cased `object-list` of
+        the IDD it can reference.
+        """
+        if self._referring_fields is None:
+            referring_fields = {}
+            for key, objidd in zip(self.model.dtls, self.idd_info):
+                fields = [
+                    (findex, set(map(str.upper, fieldidd["object-list"])))
+                    for findex, fieldidd in enumerate(objidd)
+                    if "object-list" in fieldidd
+                ]
+                if fields:
+                    referring_fields[key.upper()] = fields
+            self._referring_fields = referring_fields
+        return self._referring_fields
+
+    def _class_name_index(self, key):
+        """Return the {NAME: [EpBunch]} index of the objects of class `key`.
+
+        The index is built on first use, then updated by :meth:`_index_name` and
+        :meth:`_unindex_name`. Objects with the same name are listed in the
+        order they were added.
+        """
+        if self._name_index is None:
+            self._name_index = {}
+        index = self._name_index.get(key)
+        if index is None:
+            index = self._name_index[key] = {}
+            for obj in self.idfobjects[key]:
+                name = obj.obj[1] if len(obj.obj) > 1 else None
+                if isinstance(name, str):
+                    index.setdefault(name.upper(), []).append(obj)
+        return index
+
+    def _index_name(self, idfobject):
+        """Add `idfobject` to the name index, if the index of its class is
+        built."""
+        index = (self._name_index or {}).get(idfobject.key.upper())
+        name = idfobject.obj[1] if len(idfobject.obj) > 1 else None
+        if index is not None and isinstance(name, str):
+            index.setdefault(name.upper(), []).append(idfobject)
+
+    def _unindex_name(self, idfobject):
+        """Remove `idfobject` from the name index, if the index of its class is
+        built."""
+        index = (self._name_index or {}).get(idfobject.key.upper())
+        name = idfobject.obj[1] if len(idfobject.obj) > 1 else None
+        if index is None or not isinstance(name, str):
+            return
+        objects = index.get(name.upper(), [])
+        if not any(obj is idfobject for obj in objects):
+            # Renamed directly since it was indexed; rebuild on next use
+            del self._name_index[idfobject.key.upper()]
+            return
+        objects[:] = [obj for obj in objects if obj is not idfobject]
+        if not objects:
+            index.pop(name.upper(), None)
+
     def anidfobject(self, key, aname="", **kwargs):
         # type: (str, str, **Any) -> EpBunch
         """Create an object, but don't add to the model (See
@@ -1814,16 +2446,27 @@ class IDF(geomIDF):
             sch_type (str): The schedule type, e.g.: "SCHEDULE:YEAR".
         """
         if sch_type is None:
-            try:
-                return self.schedules_dict[name.upper()]
-            except KeyError:
-                raise KeyError(
-                    'Unable to find schedule "{}" of type "{}" '
-                    'in idf file "{}"'.format(name, sch_type, self.name)
-                )
+            for sch_type in self._schedule_types():
+                schedule = self.getobject(sch_type, name)
+                if schedule is not None:
+                    return schedule
+            raise KeyError(
+                'Unable to find schedule "{}" of type "{}" '
+                'in idf file "{}"'.format(name, None, self.name)
+            )
         else:
             return self.getobject(sch_type.upper(), name)
 
+    def _schedule_types(self, yearly_only=False):
+        if yearly_only:
+            return [
+                "Schedule:Year".upper(),
+                "Schedule:Compact".upper(),
+                "Schedule:Constant".upper(),
+                "Schedule:File".upper(),
+            ]
+        return list(map(str.upper, self.getiddgroupdict()["Schedules"]))
+
     def get_all_schedules(self, yearly_only=False):
         """Returns all schedule ep_objects in a dict with their name as a key
 
@@ -1834,32 +2477,29 @@ class IDF(geomIDF):
             (dict of eppy.bunch_subclass.EpBunch): the schedules with their
                 name as a key
         """
-        schedule_types = list(map(str.upper, self.getiddgroupdict()["Schedules"]))
-        if yearly_only:
-            schedule_types = [
-                "Schedule:Year".upper(),
-                "Schedule:Compact".upper(),
-                "Schedule:Constant".upper(),
-                "Schedule:File".upper(),
-            ]
         scheds = {}
-        for sched_type in schedule_types:
-            for sched in self.idfobjects[sched_type]:
-                try:
-                    if sched.key.upper() in schedule_types:
-                        scheds[sched.Name.upper()] = sched
-                except KeyError:
-                    pass
+        for sched_type in self._schedule_types(yearly_only):
+            for obj in self.idfobjects[sched_type]:
+                name = obj.obj[1] if len(obj.obj) > 1 else None
+                if isinstance(name, str):
+                    scheds.setdefault(name.upper(), obj)
         return scheds
 
     def get_used_schedules(self, yearly_only=False):
         """Returns all used schedules
 
+        A schedule is used if its name is found in a field that references
+        other objects (a field with an `object-list` in the IDD, see
+        :meth:`get_all_referrers`) of an object that is not itself a schedule.
+        Names found in other fields, e.g. in the Name of an object that is not
+        a schedule, are not references and are ignored.
+
         Args:
             yearly_only (bool): If True, return only yearly schedules
 
         Returns:
-            (list): the schedules names
+            (list): the schedules names, as written in the first reference to
+            each of them
         """
         schedule_types = [
             "Schedule:Day:Hourly".upper(),
@@ -1875,26 +2515,21 @@ class IDF(geomIDF):
 
         used_schedules = []
         all_schedules = self.get_all_schedules(yearly_only=yearly_only)
-        for object_name in self.idfobjects:
-            for object in self.idfobjects[object_name]:
-                if object.key.upper() not in schedule_types:
-                    for fieldvalue in object.fieldvalues:
-                        try:
-                            if (
-                                fieldvalue.upper() in all_schedules.keys()
-                                and fieldvalue not in used_schedules
-                            ):
-                                used_schedules.append(fieldvalue)
-                        except (KeyError, AttributeError):
-                            pass
+        for name, referrers in self.get_all_referrers().items():
+            if name not in all_schedules:
+                continue
+            for obj, findex in referrers:
+                if obj.key.upper() not in schedule_types:
+                    used_schedules.append(obj.obj[findex])
+                    break
         return used_schedules
 
     def rename(self, objkey, objname, newname):
         """rename all the references to this objname.
 
         Function comes from eppy.modeleditor and was modified to compare the
-        name to rename with a lower string (see
-        idfobject[idfobject.objls[findex]].lower() == objname.lower())
+        name to rename with a lower string and to only visit the classes that
+        can reference objname (see :meth:`get_referrers`).
 
         Args:
             objkey (str): EpBunch we want to rename and rename all the
@@ -1906,24 +2541,82 @@ class IDF(geomIDF):
             theobject (EpBunch): The renamed idf object
         """
 
-        refnames = eppy.modeleditor.getrefnames(self, objkey)
-        for refname in refnames:
-            objlists = eppy.modeleditor.getallobjlists(self, refname)
-            # [('OBJKEY', refname, fieldindexlist), ...]
-            for robjkey, refname, fieldindexlist in objlists:
-                idfobjects = self.idfobjects[robjkey]
-                for idfobject in idfobjects:
-                    for findex in fieldindexlist:  # for each field
-                        if (
-                            idfobject[idfobject.objls[findex]].lower()
-                            == objname.lower()
-                        ):
-                            idfobject[idfobject.objls[findex]] = newname
+        refnames = eppy.modeleditor.getrefnames(self, objkey.upper())
+        renamed = self.get_referrers(objname, set(map(str.upper, refnames)))
+        for idfobject, findex in renamed:
+            idfobject[idfobject.objls[findex]] = newname
         theobject = self.getobject(objkey, objname)
         fieldname = [item for item in theobject.objls if item.endswith("Name")][0]
+        self._unindex_name(theobject)
         theobject[fieldname] = newname
+        self._index_name(theobject)
         return theobject
 
+    def rename_many(self, mapping):
+        """Rename many objects and all the references to them in one pass.
+
+        Equivalent to calling :meth:`rename` for each item of `mapping`, but the
+        model is traversed only once.
+
+        Example:
+            >>> idf.rename_many({("ZONE", "Core"): "z_000001"})
+
+        Args:
+            mapping (dict): New names keyed by (objkey, old name).
+
+        Raises:
+            ValueError: If an object does not exist or if two objects of the
+                same class would end up with the same name.
+
+        Returns:
+            pandas.DataFrame: The equivalence table with the columns "Object",
+            "Old name" and "New name".
+        """
+        # Validate everything before touching the model.
+        renamed_objects = []
+        new_names = defaultdict(set)
+        for (objkey, old_name), new_name in mapping.items():
+            objkey = objkey.upper()
+            theobject = self.getobject(objkey, old_name)
+            if theobject is None:
+                raise ValueError(f"no {objkey} named '{old_name}' in {self.name}")
+            if new_name.upper() in new_names[objkey]:
+                raise ValueError(f"'{new_name}' is used twice for {objkey} objects")
+            new_names[objkey].add(new_name.upper())
+            renamed_objects.append((theobject, objkey, old_name, new_name))
+        renamed = {(key, old.upper()) for _, key, old, _ in renamed_objects}
+        for objkey, names in new_names.items():
+            for name in names:
+                existing = self.getobject(objkey, name)
+                if existing is not None and (objkey, name) not in renamed:
+                    raise ValueError(f"{objkey} '{name}' already exists")
+
+        # Old name -> [(reference names of the object, new name)]
+        lookup = defaultdict(list)
+        for theobject, objkey, old_name, new_name in renamed_objects:
+            refnames = eppy.modeleditor.getrefnames(self, objkey)
+            lookup[old_name.upper()].append(({*map(str.upper, refnames)}, new_name))
+
+        # Rewrite the references in one pass over the model.
+        for objects in self.idfobjects.values():
+            for obj in objects:
+                for findex, value in _reference_fields(obj):
+                    for refnames, new_name in lookup.get(value, []):
+                        object_lists = obj.objidd[findex]["object-list"]
+                        if refnames.intersection(map(str.upper, object_lists)):
+                            obj.obj[findex] = new_name
+                            break
+
+        for theobject, _, _, new_name in renamed_objects:
+            fieldname = [item for item in theobject.objls if item.endswith("Name")][0]
+            theobject[fieldname] = new_name
+        # The name index is cheaper to rebuild than to update for a bulk rename.
+        self._name_index = None
+        return pd.DataFrame(
+            [(key, old, new) for _, key, old, new in renamed_objects],
+            columns=["Object", "Old name", "New name"],
+        )
+
     def _energy_series(
         self,
         energy_out_variable_name,
@@ -2025,3 +2718,164 @@ def _process_csv(file, working_dir, simulname):
     else:
         log("file %s stored" % file)
         return df
+
+
+_COMMENT = re.compile(r"!.*")
+
+
+def _read_objects(idfname, data, eager):
+    """Parse the objects of an idf file into `data`, splitting only the fields of
+    the classes in `eager`.
+
+    Same as :class:`eppy.EPlusInterfaceFunctions.eplusdata.Eplusdata`, but only
+    the class name of the other objects is read; their text is returned so that
+    their fields can be split and converted later by :func:`_makebunches`. The
+    whole file is still read and its comments removed to find the boundaries of
+    the objects.
+
+    Args:
+        idfname (str or StringIO): The idf file.
+        data (Eplusdata): The blank model to fill.
+        eager (set of str): The upper-cased classes to parse.
+
+    Returns:
+        dict: The text of the objects of the other classes, by class.
+    """
+    if isinstance(idfname, StringIO):
+        text = idfname.read()
+    else:
+        with open(idfname, "rb") as f:
+            text = f.read().decode("ISO-8859-2")
+    deferred = {}
+    # Same as eplusdata.removecomment(text, "!"), in one pass over the text
+    for element in _COMMENT.sub("", text).split(";"):
+        key = element.partition(",")[0].strip().upper()
+        if key not in data.dt:
+            continue
+        if key in eager:
+            data.dt[key].append([field.strip() for field in element.split(",")])
+        else:
+            deferred.setdefault(key, []).append(element)
+    return deferred
+
+
+def _makebunches(data, idd_info, theidf, deferred=None, eager=None):
+    """Make the :class:`EpBunch` objects of a model.
+
+    Same as :func:`geomeppy.patches.makebunches`, but the field names of each
+    class are computed once per class instead of once per object, which is the
+    bulk of the time spent loading models with many objects.
+
+    If `eager` is given, only the classes in `eager` are made right away. The
+    other classes are made the first time they are accessed, either through
+    the returned dict or through `data.dt`; the text of their objects in
+    `deferred` (see :func:`_read_objects`) is only parsed then.
+
+    Returns:
+        dict: The :class:`Idf_MSequence` of each class.
+    """
+    deferred = deferred or {}
+    indices = {key.upper(): obj_i for obj_i, key in enumerate(data.dtls)}
+    bunchdt = {}
+
+    def makebunch(key):
+        objidd = idd_info[indices[key]]
+        objs = dict.__getitem__(data.dt, key)
+        for element in deferred.pop(key, []):
+            obj = [field.strip() for field in element.split(",")]
+            objs.append(convertfields(objidd, obj))
+        objfields = [comm.get("field") for comm in objidd]
+        objfields[0] = ["key"]
+        obj_fields = [bunchhelpers.makefieldname(field[0]) for field in objfields]
+        dict.__setitem__(
+            bunchdt,
+            key,
+            Idf_MSequence(
+                [EpBunch(obj, obj_fields, objidd) for obj in objs], objs, theidf
+            ),
+        )
+        if theidf._loaded_digests is not None:
+            # The state of the class as read, see IDF.content_digest()
+            theidf._loaded_digests[key] = objects_digest(objs)
+
+    if eager is None:
+        for key in indices:
+            makebunch(key)
+        return bunchdt
+
+    pending = set(indices)
+
+    def materialize(key):
+        pending.discard(key)
+        makebunch(key)
+
+    bunchdt = _LazyDict(dict.fromkeys(indices), pending, materialize)
+    data.dt = _LazyDict(data.dt, pending, materialize)
+    for key in eager & pending:
+        materialize(key)
+    return bunchdt
+
+
+class _LazyDict(dict):
+    """A dict of which the values of the `pending` keys are set by
+    `materialize(key)` the first time they are accessed.
+
+    Used for the idfobjects and the model of partially loaded models; the two
+    dicts share the same `pending` set so that a class is materialized in both
+    at once. Iterating over the values or items, copying or pickling
+    materializes all the keys.
+    """
+
+    def __init__(self, items, pending, materialize):
+        super(_LazyDict, self).__init__(items)
+        self._pending = pending
+        self._materialize = materialize
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            self._materialize(key)
+        return super(_LazyDict, self).__getitem__(key)
+
+    def __setitem__(self, key, value):
+        if key in self._pending:
+            self._materialize(key)
+        super(_LazyDict, self).__setitem__(key, value)
+
+    def get(self, key, default=None):
+        if key in self._pending:
+            self._materialize(key)
+        return super(_LazyDict, self).get(key, default)
+
+    def __iter__(self):
+        # Overriding __iter__ also makes dict(x) and {**x} go through
+        # __getitem__ instead of copying the pending values directly.
+        return super(_LazyDict, self).__iter__()
+
+    def values(self):
+        self.materialize_all()
+        return super(_LazyDict, self).values()
+
+    def items(self):
+        self.materialize_all()
+        return super(_LazyDict, self).items()
+
+    def copy(self):
+        return dict(self.items())
+
+    def materialize_all(self):
+        """Materialize all the pending keys."""
+        for key in list(self._pending):
+            self._materialize(key)
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+
+def _reference_fields(obj):
+    """Yield (field index, upper-cased value) of the non-empty fields of `obj`
+    that reference other objects."""
+    for findex, fieldidd in enumerate(obj.objidd[: len(obj.obj)]):
+        if "object-list" in fieldidd:
+            value = obj.obj[findex]
+            if isinstance(value, str) and value:
+                yield findex, value.upper()
@@ -1,9 +1,15 @@
 """EnergyPlus reports module."""
 
+import logging as lg
 import os
+import pathlib
+import sqlite3
+import threading
+from collections.abc import Mapping
 from sqlite3.dbapi2 import OperationalError
 
 import pandas as pd
+from path import Path
 
 from archetypal import log, settings
 from archetypal.idfclass.util import hash_model
@@ -102,7 +108,10 @@ def summary_reports_to_dataframes(reports_list):
 
 
 def get_sqlite_report(report_file, report_tables=None):
-    """Connect to the EnergyPlus SQL output file and retrieves all tables
+    """Connect to the EnergyPlus SQL output file and map its tables
+
+    The tables are read lazily: a table is only loaded as a DataFrame the first
+    time it is accessed, and is cached afterwards (see :class:`SqliteReport`).
 
     Args:
         report_file (str): path of report file
@@ -110,54 +119,209 @@ def get_sqlite_report(report_file, report_tables=None):
             Defaults to settings.available_sqlite_tables
 
     Returns:
-        dict: dict of DataFrames
+        SqliteReport: Mapping of table names to DataFrames
     """
     # set list of report tables
     if not report_tables:
         report_tables = settings.available_sqlite_tables
 
-    # if file exists, parse it with pandas' read_sql_query
     if os.path.isfile(report_file):
-        import sqlite3
+        return SqliteReport(report_file, report_tables)
+
+
+class SqliteReport(Mapping):
+    """Read-only mapping of the tables of an EnergyPlus SQL output file to
+    DataFrames.
+
+    A table is read with pandas' read_sql_query the first time it is accessed
+    and is cached afterwards, so that only the tables that are used are loaded.
+    Large tables such as ReportData and Time are never read unless they are
+    accessed.
+
+    Args:
+        report_file (str): path of report file
+        report_tables (dict): {table name: {"PrimaryKey": list, "ParseDates":
+            list or dict}} of the tables of the mapping.
+    """
+
+    def __init__(self, report_file, report_tables):
+        self.report_file = report_file
+        self.report_tables = report_tables
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, table):
+        if table not in self.report_tables:
+            raise KeyError(table)
+        with self._lock:
+            if table not in self._tables:
+                self._tables[table] = self._read_table(table)
+            return self._tables[table]
+
+    def __iter__(self):
+        return iter(self.report_tables)
 
+    def __len__(self):
+        return len(self.report_tables)
+
+    def __repr__(self):
+        return (
+            f"<{type(self).__name__} '{self.report_file}' "
+            f"({len(self._tables)}/{len(self)} tables loaded)>"
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        """list: The names of the tables loaded so far."""
+        return list(self._tables)
+
+    def memory_usage(self, deep=True):
+        """Return the memory usage of each loaded table in bytes.
+
+        Args:
+            deep (bool): If True, introspect the data deeply by interrogating
+                object dtypes for system-level memory consumption. See
+                :meth:`pandas.DataFrame.memory_usage`.
+
+        Returns:
+            pandas.Series: The memory usage, indexed by table name.
+        """
+        return pd.Series(
+            {
+                table: df.memory_usage(index=True, deep=deep).sum()
+                for table, df in list(self._tables.items())
+            },
+            dtype="int64",
+        )
+
+    def _read_table(self, table):
         import numpy as np
 
+        query = "select * from {};".format(table)
+        kwargs = dict(
+            index_col=self.report_tables[table]["PrimaryKey"],
+            parse_dates=self.report_tables[table]["ParseDates"],
+            coerce_float=True,
+        )
         # create database connection with sqlite3
-        with sqlite3.connect(report_file) as conn:
-            # empty dict to hold all DataFrames
-            all_tables = {}
-            # Iterate over all tables in the report_tables list
-            for table in report_tables:
-                try:
-                    # Try regular str read, could fail if wrong encoding
-                    conn.text_factory = str
-                    df = pd.read_sql_query(
-                        "select * from {};".format(table),
-                        conn,
-                        index_col=report_tables[table]["PrimaryKey"],
-                        parse_dates=report_tables[table]["ParseDates"],
-                        coerce_float=True,
-                    )
-                    all_tables[table] = df
-                except OperationalError:
-                    # Wring encoding found, the load bytes and ecode object
-                    # columns only
-                    conn.text_factory = bytes
-                    df = pd.read_sql_query(
-                        "select * from {};".format(table),
-                        conn,
-                        index_col=report_tables[table]["PrimaryKey"],
-                        parse_dates=report_tables[table]["ParseDates"],
-                        coerce_float=True,
-                    )
-                    str_df = df.select_dtypes([np.object])
-                    str_df = str_df.stack().str.decode("8859").unstack()
-                    for col in str_df:
-                        df[col] = str_df[col]
-                    all_tables[table] = df
-            log(
-                "SQL query parsed {} tables as DataFrames from {}".format(
-                    len(all_tables), report_file
-                )
-            )
-            return all_tables
+        with sqlite3.connect(self.report_file) as conn:
+            try:
+                # Try regular str read, could fail if wrong encoding
+                conn.text_factory = str
+                df = pd.read_sql_query(query, conn, **kwargs)
+            except OperationalError:
+                # Wring encoding found, the load bytes and ecode object
+                # columns only
+                conn.text_factory = bytes
+                df = pd.read_sql_query(query, conn, **kwargs)
+                str_df = df.select_dtypes([np.object_])
+                str_df = str_df.stack().str.decode("8859").unstack()
+                for col in str_df:
+                    df[col] = str_df[col]
+        log(
+            "SQL query parsed table '{}' as a DataFrame from {}".format(
+                table, self.report_file
+            ),
+            lg.DEBUG,
+        )
+        return df
+
+
+# Queries run once per zone or per building. The sqlite3 module keeps the
+# statements it prepared in a cache of each connection, keyed by their text, so
+# these are only prepared once per connection.
+ZONE_SUMMARY_QUERY = (
+    "SELECT Value FROM TabularDataWithStrings "
+    "WHERE TableName='Zone Summary' AND ColumnName=? AND RowName=?"
+)
+BUILDING_AREA_QUERY = (
+    "SELECT Value FROM TabularDataWithStrings "
+    "WHERE TableName='Building Area' AND ColumnName='Area' AND RowName=?"
+)
+
+
+class SqliteConnections:
+    """Read-only connections to an EnergyPlus SQL output file, one per thread.
+
+    The file is opened with ``mode=ro&immutable=1``: SQLite neither locks it nor
+    checks it for changes, which makes opening and querying cheap. The file must
+    therefore not change while the connections are open; see
+    :attr:`~archetypal.idfclass.idf.IDF.sql_connections`.
+
+    Args:
+        report_file (str or Path): path of report file
+    """
+
+    def __init__(self, report_file):
+        self.report_file = Path(report_file).expand().abspath()
+        self._connections = {}  # {thread id: connection}
+        self._lock = threading.Lock()
+
+    @property
+    def uri(self):
+        """str: The URI of the read-only, immutable database."""
+        return f"{pathlib.Path(self.report_file).as_uri()}?mode=ro&immutable=1"
+
+    def connection(self):
+        """Return the connection of the calling thread, opening it if needed.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        thread = threading.get_ident()
+        conn = self._connections.get(thread)
+        if conn is None:
+            conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+            with self._lock:
+                self._connections[thread] = conn
+        return conn
+
+    def execute(self, sql_query, parameters=()):
+        """Execute a query on the connection of the calling thread.
+
+        Returns:
+            sqlite3.Cursor: The cursor of the query.
+        """
+        return self.connection().execute(sql_query, parameters)
+
+    def zone_summary(self, zone_name, column_name):
+        """The value of a zone in the 'Zone Summary' table.
+
+        Args:
+            zone_name (str): The name of the zone.
+            column_name (str): The column, e.g. "Multipliers".
+
+        Returns:
+            str: The value, or None if the zone is not in the table.
+        """
+        res = self.execute(ZONE_SUMMARY_QUERY, (column_name, zone_name.upper()))
+        row = res.fetchone()
+        return None if row is None else row[0]
+
+    def building_area(self, row_name):
+        """The value of a row of the 'Building Area' table.
+
+        Args:
+            row_name (str): The row, e.g. "Total Building Area".
+
+        Returns:
+            float: The area.
+        """
+        (res,) = self.execute(BUILDING_AREA_QUERY, (row_name,)).fetchone()
+        return float(res)
+
+    def close(self):
+        """Close the connections of all threads."""
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for conn in connections.values():
+            conn.close()
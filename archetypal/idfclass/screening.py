@@ -0,0 +1,255 @@
+"""Fast "screening" simulations: a copy of a model simulated with coarser
+settings, and the comparison of its results with a full-fidelity run."""
+
+import json
+import logging as lg
+import pickle
+import sqlite3
+
+import pandas as pd
+from path import Path
+
+from archetypal.eplus_interface.events import MANIFEST
+from archetypal.utils import log
+
+# Settings of the screening profile
+SCREENING_SETTINGS = dict(
+    timesteps_per_hour=2,
+    shading_update_frequency=30,
+    max_hvac_iterations=10,
+    min_plant_iterations=1,
+    max_plant_iterations=4,
+    max_warmup_days=6,
+    min_warmup_days=1,
+)
+
+# Output classes that only produce reports not needed to screen a design
+_DROPPED_OUTPUTS = (
+    "OUTPUT:SURFACES:DRAWING",
+    "OUTPUT:SURFACES:LIST",
+    "OUTPUT:CONSTRUCTIONS",
+    "OUTPUT:DAYLIGHTFACTORS",
+    "OUTPUT:DEBUGGINGDATA",
+    "OUTPUT:DIAGNOSTICS",
+)
+
+# Reporting frequencies of meters coarsened to hourly; annual totals are unchanged
+_FINE_FREQUENCIES = {"DETAILED", "TIMESTEP"}
+
+
+def screening_copy(idf, outputs=None, **settings):
+    """Create a copy of `idf` with the settings of the screening profile.
+
+    The copy is simulated faster than the original at the price of some
+    accuracy: fewer timesteps per hour, less frequent shading calculations,
+    relaxed HVAC and plant convergence limits, fewer warmup days and no output
+    variables other than `outputs`. Meters are kept. The original model is not
+    modified.
+
+    Args:
+        idf (IDF): The model.
+        outputs (list of str, optional): Names of the output variables to keep,
+            e.g. ``["Zone Mean Air Temperature"]``. By default, all output
+            variables are removed.
+        **settings: Overrides of :data:`SCREENING_SETTINGS`.
+
+    Returns:
+        IDF: The screening model, saved in the output directory of the original
+        model as "<name>_screening.idf", or "<sim_id>_screening.idf" if the
+        model has no name (e.g. a model read from a StringIO). Its results are
+        written to the same output directory.
+    """
+    settings = {**SCREENING_SETTINGS, **settings}
+    unknown = set(settings) - set(SCREENING_SETTINGS)
+    if unknown:
+        raise ValueError(f"unknown screening settings {sorted(unknown)}")
+
+    stem = Path(idf.name).stem if idf.name else idf.sim_id
+    filename = idf.output_directory / f"{stem}_screening.idf"
+    idf.savecopy(filename)
+    copy = type(idf).__new__(type(idf))
+    # a deep copy, so that the objects of the original model are left untouched
+    copy._snapshot = pickle.loads(pickle.dumps(idf._get_snapshot()))
+    copy.__init__(
+        filename,
+        epw=idf.epw,
+        as_version=idf.as_version,
+        annual=idf.annual,
+        design_day=idf.design_day,
+        expandobjects=idf.expandobjects,
+        verbose=idf.verbose,
+        readvars=idf.readvars,
+        prep_outputs=False,
+        include=list(idf.include),
+        custom_processes=idf.custom_processes,
+        output_suffix=idf.output_suffix,
+        epmacro=idf.epmacro,
+        keep_data=idf.keep_data,
+        keep_data_err=idf.keep_data_err,
+        position=idf.position,
+        keep=idf.keep,
+        event_callbacks=list(idf.event_callbacks),
+        output_directory=idf.output_directory,
+    )
+    _apply_settings(copy, settings, outputs or [])
+    return copy
+
+
+def _apply_settings(idf, settings, outputs):
+    timestep = _get_or_create(idf, "TIMESTEP")
+    timestep.Number_of_Timesteps_per_Hour = settings["timesteps_per_hour"]
+
+    shadow = _get_or_create(idf, "SHADOWCALCULATION")
+    # The field was renamed in EnergyPlus 9.3
+    for field in ("Calculation_Frequency", "Shading_Calculation_Update_Frequency"):
+        if field in shadow.fieldnames:
+            setattr(shadow, field, settings["shading_update_frequency"])
+
+    limits = _get_or_create(idf, "CONVERGENCELIMITS")
+    # The HVAC timestep is not allowed to drop below the zone timestep
+    limits.Minimum_System_Timestep = 60 // settings["timesteps_per_hour"]
+    limits.Maximum_HVAC_Iterations = settings["max_hvac_iterations"]
+    limits.Minimum_Plant_Iterations = settings["min_plant_iterations"]
+    limits.Maximum_Plant_Iterations = settings["max_plant_iterations"]
+
+    for building in idf.idfobjects["BUILDING"]:
+        building.Maximum_Number_of_Warmup_Days = settings["max_warmup_days"]
+        building.Minimum_Number_of_Warmup_Days = settings["min_warmup_days"]
+
+    keep = {name.upper() for name in outputs}
+    for variable in list(idf.idfobjects["OUTPUT:VARIABLE"]):
+        if variable.Variable_Name.upper() not in keep:
+            idf.removeidfobject(variable)
+    for key in _DROPPED_OUTPUTS:
+        if key in idf.idfobjects:
+            for obj in list(idf.idfobjects[key]):
+                idf.removeidfobject(obj)
+    for key in ("OUTPUT:METER", "OUTPUT:METER:METERFILEONLY"):
+        for meter in idf.idfobjects[key]:
+            if str(meter.Reporting_Frequency).upper() in _FINE_FREQUENCIES:
+                meter.Reporting_Frequency = "Hourly"
+
+
+def _get_or_create(idf, key):
+    objects = idf.idfobjects[key]
+    if objects:
+        return objects[0]
+    return idf.newidfobject(key)
+
+
+def simulate_screening(idf, outputs=None, **kwargs):
+    """Simulate the screening copy of `idf` (see :func:`screening_copy`) and log
+    the runtime saved compared to the full-fidelity run of `idf`, if one was
+    run before.
+
+    Args:
+        idf (IDF): The model.
+        outputs (list of str, optional): Names of the output variables to keep.
+        **kwargs: Keyword arguments of :meth:`IDF.simulate`.
+
+    Returns:
+        IDF: The simulated screening model.
+    """
+    screening = screening_copy(idf, outputs=outputs)
+    screening.simulate(**kwargs)
+    full_time, screening_time = wall_time(idf), wall_time(screening)
+    if full_time and screening_time is not None:
+        log(
+            f"Screening simulation of '{idf.name}' ran in {screening_time:,.2f} "
+            f"seconds instead of {full_time:,.2f} seconds "
+            f"({1 - screening_time / full_time:.0%} saved)"
+        )
+    elif screening_time is not None:
+        log(
+            f"Screening simulation of '{idf.name}' ran in {screening_time:,.2f} "
+            f"seconds; no full-fidelity run to compare with"
+        )
+    return screening
+
+
+def wall_time(idf):
+    """The wall time, in seconds, of the last simulation of `idf`.
+
+    Read from the run manifest of :attr:`IDF.simulation_dir`.
+
+    Returns:
+        float: The wall time, or None if the model was not simulated.
+    """
+    try:
+        with open(idf.simulation_dir / MANIFEST, "r") as f:
+            return json.load(f)["wall_time"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def annual_meters(sql_file):
+    """Sum the meters reported in an EnergyPlus sql file over the run periods.
+
+    Warmup days are excluded. Design days are only used if the simulation has no
+    weather file run period.
+
+    Args:
+        sql_file (str or Path): The sql file.
+
+    Returns:
+        pandas.Series: The totals, indexed by meter name, in the units of the
+        meters (J for energy meters).
+    """
+    sql_query = """
+    SELECT rdd.Name, rdd.ReportingFrequency, p.EnvironmentType,
+           SUM(rd.Value) AS Value
+    FROM ReportData AS rd
+        INNER JOIN ReportDataDictionary AS rdd
+            ON rd.ReportDataDictionaryIndex = rdd.ReportDataDictionaryIndex
+        INNER JOIN Time AS t ON rd.TimeIndex = t.TimeIndex
+        INNER JOIN EnvironmentPeriods AS p
+            ON t.EnvironmentPeriodIndex = p.EnvironmentPeriodIndex
+    WHERE rdd.IsMeter = 1 AND IFNULL(t.WarmupFlag, 0) = 0
+    GROUP BY rdd.Name, rdd.ReportingFrequency, p.EnvironmentType;
+    """
+    with sqlite3.connect(sql_file) as conn:
+        df = pd.read_sql_query(sql_query, conn)
+    # The totals of a meter reported at several frequencies are the same; prefer
+    # the weather file run period (EnvironmentType 3) to the design days.
+    df = df.sort_values("EnvironmentType", ascending=False)
+    df = df[df.EnvironmentType == df.groupby("Name").EnvironmentType.transform("max")]
+    return df.drop_duplicates("Name").set_index("Name").Value.rename(None)
+
+
+def compare_screening(idf, meters=None, outputs=None, **kwargs):
+    """Quantify the error of the screening profile on the annual meters of a
+    model.
+
+    Both the full-fidelity and the screening simulations of `idf` are run (or
+    restored from the cache) and the annual totals of their meters are compared.
+
+    Args:
+        idf (IDF): The model.
+        meters (list of str, optional): Names of the meters to compare, e.g.
+            ``["Electricity:Facility", "Heating:EnergyTransfer"]``. Defaults to
+            all the meters of both simulations.
+        outputs (list of str, optional): Names of the output variables kept in
+            the screening model.
+        **kwargs: Keyword arguments of :meth:`IDF.simulate`.
+
+    Returns:
+        pandas.DataFrame: The "full" and "screening" totals of each meter, and
+        the relative "error" of the screening total.
+    """
+    idf.simulate(**kwargs)
+    screening = simulate_screening(idf, outputs=outputs, **kwargs)
+    df = pd.concat(
+        {
+            "full": annual_meters(idf.sql_file),
+            "screening": annual_meters(screening.sql_file),
+        },
+        axis=1,
+        join="inner",
+    )
+    if meters is not None:
+        missing = set(meters) - set(df.index)
+        if missing:
+            log(f"Meters {sorted(missing)} were not reported", lg.WARNING)
+        df = df.loc[[meter for meter in meters if meter in df.index]]
+    df["error"] = (df.screening - df.full) / df.full.where(df.full != 0)
+    return df
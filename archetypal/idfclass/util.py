@@ -1,15 +1,43 @@
 """IdfClass utilities."""
 
 import hashlib
+import logging as lg
 import os
+import pickle
+import threading
+import uuid
 from collections import OrderedDict
 from io import StringIO
 from path import Path
 
 import eppy
 from eppy.EPlusInterfaceFunctions import parse_idd
+from eppy.idfreader import iddversiontuple
 
-from archetypal import log
+from archetypal import log, settings
+
+
+_CHUNK_SIZE = 2 ** 20  # 1 MiB
+
+# Fields holding the path of an external input file (the class name is field 0).
+EXTERNAL_FILE_FIELDS = {
+    "SCHEDULE:FILE": 3,
+    "SCHEDULE:FILE:SHADING": 1,
+    "EXTERNALINTERFACE:FUNCTIONALMOCKUPUNITIMPORT": 1,
+}
+_EXTERNAL_FILE_TOKENS = (b"schedule:file", b"functionalmockupunitimport")
+
+# Memoized file digests keyed by (path, size, mtime_ns).
+_FILE_DIGESTS = OrderedDict()
+_FILE_DIGESTS_MAXSIZE = 1024
+
+# Cached idf versions keyed by path; values are ((mtime_ns, size), version).
+_IDF_VERSIONS = OrderedDict()
+_IDF_VERSIONS_MAXSIZE = 16384
+
+# Parsed IDD files keyed by (path, size, mtime_ns), shared by all IDF instances.
+_IDD_DATA = {}
+_IDD_LOCK = threading.Lock()
 
 
 def hash_model(idfname, **kwargs):
@@ -19,11 +47,14 @@ def hash_model(idfname, **kwargs):
     arguments so that correct results are returned when different run arguments are
     used.
 
-    Todo:
-        Hashing should include the external files used an idf file. For example,
-        if a model uses a csv file as an input and that file changes, the
-        hashing will currently not pickup that change. This could result in
-        loading old results without the user knowing.
+    Files are hashed in chunks so that memory use stays constant regardless of the
+    size of the model, and their digests are memoized on (path, size, mtime_ns) so
+    that hashing the same unchanged file again is free. A parsed IDF is hashed from
+    the content of the file it was read from as long as its objects are unchanged
+    (see :meth:`IDF.content_digest`), so that it hashes the same whether it was
+    parsed or not. External input files
+    referenced by the model (e.g. the csv file of a `Schedule:File`) are folded
+    into the digest so that a change to those files invalidates cached results.
 
     Args:
         idfname (str or IDF): path of the idf file or the IDF model itself.
@@ -46,15 +77,38 @@ def hash_model(idfname, **kwargs):
 
     # create hasher
     hasher = hashlib.md5()
-    if isinstance(idfname, StringIO):
-        idfname.seek(0)
-        buf = idfname.read().encode("utf-8")
-    elif isinstance(idfname, IDF):
-        buf = idfname.idfstr().encode("utf-8")
+    if isinstance(idfname, IDF) and (
+        idfname._idfobjects is not None or idfname._snapshot is not None
+    ):
+        # The model is parsed, or waiting to be loaded from a snapshot, and may
+        # have been modified in memory.
+        hasher.update(idfname.content_digest())
+        externals = _external_files(
+            [obj.fieldvalues for obj in _iter_external_objects(idfname)],
+            _idf_directory(idfname.idfname),
+        )
     else:
-        with open(idfname, "rb") as afile:
-            buf = afile.read()
-    hasher.update(buf)
+        if isinstance(idfname, IDF):
+            # Not parsed yet; the file on disk is the model.
+            idfname = idfname.idfname
+        digest, has_external = file_digest(idfname)
+        hasher.update(digest)
+        externals = []
+        if has_external:
+            externals = _external_files(
+                (
+                    fields
+                    for fields in iter_idf_objects(idfname)
+                    if fields[0].upper() in EXTERNAL_FILE_FIELDS
+                ),
+                _idf_directory(idfname),
+            )
+    for external in externals:
+        if external.exists():
+            hasher.update(_hash_file(external)[0].digest())
+        else:
+            log(f"could not find external file '{external}' to hash", lg.DEBUG)
+            hasher.update(str(external).encode("utf-8"))
 
     # Hashing the kwargs as well
     for k, v in kwargs.items():
@@ -63,15 +117,144 @@ def hash_model(idfname, **kwargs):
         elif isinstance(v, list):
             # include files are Paths
             for item in v:
-                with open(item, "rb") as f:
-                    buf = f.read()
-                    hasher.update(buf)
+                hasher.update(_hash_file(item)[0].digest())
+        else:
+            # bools, numbers, versions, etc.
+            hasher.update(f"{k}={v}".encode("utf-8"))
     return hasher.hexdigest()
 
 
+def file_digest(idfname):
+    """Return the md5 digest of the content of an idf file and whether the file
+    references external files.
+
+    Args:
+        idfname (str or StringIO): Path of the idf file or the file itself.
+
+    Returns:
+        tuple: (bytes, bool).
+    """
+    if isinstance(idfname, StringIO):
+        idfname.seek(0)
+        hasher = hashlib.md5()
+        has_external = False
+        for chunk in iter(lambda: idfname.read(_CHUNK_SIZE), ""):
+            chunk = chunk.encode("utf-8")
+            hasher.update(chunk)
+            has_external |= _references_external(chunk)
+        idfname.seek(0)
+        return hasher.digest(), has_external
+    hasher, has_external = _hash_file(idfname)
+    return hasher.digest(), has_external
+
+
+def objects_digest(objects):
+    """Return the md5 digest of the field values of a list of idf objects (the
+    lists of :attr:`eppy.modeleditor.IDF.model.dt`)."""
+    return hashlib.md5(repr(objects).encode("utf-8")).digest()
+
+
+def iter_idf_objects(file):
+    """Iterate over the objects of an idf file without parsing it with the IDD.
+
+    The file is read line by line so that memory use stays constant. Comments are
+    stripped and field values are stripped of surrounding whitespace.
+
+    Args:
+        file (str or StringIO): Path of the idf file or the file itself.
+
+    Yields:
+        list of str: The fields of each object. The first field is the class name.
+    """
+    if isinstance(file, StringIO):
+        file.seek(0)
+        try:
+            yield from _iter_objects(file)
+        finally:
+            file.seek(0)
+    else:
+        with open(file, "r", encoding="latin-1") as fhandle:
+            yield from _iter_objects(fhandle)
+
+
+def _iter_objects(lines):
+    buffer = ""
+    for line in lines:
+        line = line.split("!", 1)[0]
+        *complete, rest = line.split(";")
+        for part in complete:
+            yield [field.strip() for field in (buffer + part).split(",")]
+            buffer = ""
+        buffer += rest + " "
+
+
+def _hash_file(filename):
+    """Return the md5 hasher of the content of `filename` and whether the file
+    references external files. Results are memoized on (path, size, mtime_ns);
+    the returned hasher is a copy that can be updated freely."""
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    key = (filename, stat.st_size, stat.st_mtime_ns)
+    try:
+        hasher, has_external = _FILE_DIGESTS[key]
+    except KeyError:
+        hasher = hashlib.md5()
+        has_external = False
+        tail = b""
+        with open(filename, "rb") as afile:
+            for chunk in iter(lambda: afile.read(_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                # Keep the end of the previous chunk so that tokens spanning two
+                # chunks are detected.
+                has_external |= _references_external(tail + chunk)
+                tail = chunk[-64:]
+        _FILE_DIGESTS[key] = hasher, has_external
+        if len(_FILE_DIGESTS) > _FILE_DIGESTS_MAXSIZE:
+            _FILE_DIGESTS.popitem(last=False)
+    return hasher.copy(), has_external
+
+
+def _references_external(chunk):
+    chunk = chunk.lower()
+    return any(token in chunk for token in _EXTERNAL_FILE_TOKENS)
+
+
+def _iter_external_objects(idf):
+    for key in EXTERNAL_FILE_FIELDS:
+        yield from idf.idfobjects.get(key, [])
+
+
+def _idf_directory(idfname):
+    if isinstance(idfname, StringIO):
+        return Path(os.getcwd())
+    return Path(os.path.abspath(idfname)).dirname()
+
+
+def _external_files(objects, directory):
+    """Resolve the paths of the external files referenced by `objects`.
+
+    Relative paths are resolved against the directory of the idf file first and
+    then against the current working directory, as EnergyPlus does.
+    """
+    files = []
+    for fields in objects:
+        index = EXTERNAL_FILE_FIELDS[fields[0].upper()]
+        if len(fields) <= index or not fields[index]:
+            continue
+        file = Path(fields[index]).expand()
+        if not file.isabs():
+            local = directory / file
+            file = local if local.exists() else Path(os.path.abspath(file))
+        files.append(file)
+    return files
+
+
 def get_idf_version(file, doted=True):
-    """Get idf version quickly by reading first few lines of idf file containing
-    the 'VERSION' identifier
+    """Get idf version quickly by reading the idf file up to the 'VERSION' object.
+
+    The file is tokenized incrementally and reading stops as soon as the VERSION
+    object is parsed. Results are cached per path and invalidated when the
+    modification time or the size of the file changes.
 
     Args:
         file (str or StringIO): Absolute or relative Path to the idf file
@@ -80,30 +263,97 @@ def get_idf_version(file, doted=True):
     Returns:
         str: the version id
     """
-    if isinstance(file, StringIO):
-        file.seek(0)
-        txt = file.read()
-    else:
-        with open(os.path.abspath(file), "r", encoding="latin-1") as fhandle:
-            txt = fhandle.read()
     try:
-        ntxt = parse_idd.nocomment(txt, "!")
-        blocks = ntxt.split(";")
-        blocks = [block.strip() for block in blocks]
-        bblocks = [block.split(",") for block in blocks]
-        bblocks1 = [[item.strip() for item in block] for block in bblocks]
-        ver_blocks = [block for block in bblocks1 if block[0].upper() == "VERSION"]
-        ver_block = ver_blocks[0]
-        if doted:
-            versionid = ver_block[1]
+        if isinstance(file, StringIO):
+            versionid = _read_idf_version(file)
         else:
-            versionid = ver_block[1].replace(".", "-") + "-0"
+            filename = os.path.abspath(file)
+            stat = os.stat(filename)
+            key = (stat.st_mtime_ns, stat.st_size)
+            cached = _IDF_VERSIONS.get(filename)
+            if cached is not None and cached[0] == key:
+                versionid = cached[1]
+            else:
+                versionid = _read_idf_version(filename)
+                _IDF_VERSIONS[filename] = key, versionid
+                if len(_IDF_VERSIONS) > _IDF_VERSIONS_MAXSIZE:
+                    _IDF_VERSIONS.popitem(last=False)
     except Exception as e:
         log('Version id for file "{}" cannot be found'.format(file))
         log("{}".format(e))
         raise
-    else:
+    if doted:
         return versionid
+    else:
+        return versionid.replace(".", "-") + "-0"
+
+
+def _read_idf_version(file):
+    objects = iter_idf_objects(file)
+    try:
+        for fields in objects:
+            if fields[0].upper() == "VERSION":
+                return fields[1]
+    finally:
+        objects.close()  # Closes the file without reading the rest of it.
+    raise IndexError("no VERSION object found")
+
+
+def get_idd_data(iddname):
+    """Get the parsed content of an IDD file.
+
+    Parsing an Energy+.idd takes a few seconds, so the result is cached in memory
+    for the lifetime of the process. If `settings.use_cache` is True, it is also
+    serialized in `settings.cache_folder` (keyed by the name and the content
+    hash of the IDD file) so that other processes, e.g. the workers of
+    :func:`~archetypal.utils.parallel_process`, can skip parsing entirely.
+
+    Args:
+        iddname (str or Path): The path of the IDD file.
+
+    Returns:
+        tuple: (block, idd_info, idd_index, idd_version), as returned by
+        :func:`eppy.EPlusInterfaceFunctions.parse_idd.extractidddata` and
+        :func:`eppy.idfreader.iddversiontuple`.
+    """
+    iddname = os.path.abspath(iddname)
+    stat = os.stat(iddname)
+    key = (iddname, stat.st_size, stat.st_mtime_ns)
+    with _IDD_LOCK:
+        try:
+            return _IDD_DATA[key]
+        except KeyError:
+            pass
+
+        cache_file = None
+        if settings.use_cache:
+            digest = _hash_file(iddname)[0].hexdigest()
+            name, _ = os.path.splitext(os.path.basename(iddname))
+            cache_file = settings.cache_folder / "idd" / f"{name}-{digest}.pkl"
+        idd_data = None
+        if cache_file is not None and cache_file.exists():
+            try:
+                with open(cache_file, "rb") as f:
+                    idd_data = pickle.load(f)
+            except Exception as e:
+                log(f"could not load cached idd '{cache_file}': {e}", lg.WARNING)
+            else:
+                log(f"loaded cached idd '{cache_file}'", lg.DEBUG)
+        if idd_data is None:
+            block, _, idd_info, idd_index = parse_idd.extractidddata(iddname)
+            idd_data = block, idd_info, idd_index, iddversiontuple(iddname)
+            if cache_file is not None:
+                cache_file.dirname().makedirs_p()
+                tmp = (
+                    cache_file.dirname()
+                    / f".{cache_file.basename()}-{uuid.uuid4().hex}"
+                )
+                with open(tmp, "wb") as f:
+                    pickle.dump(idd_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, cache_file)
+                log(f"parsed and cached idd '{iddname}' in {cache_file}", lg.DEBUG)
+        _IDD_DATA[key] = idd_data
+        return idd_data
 
 
 def getoldiddfile(versionid):
@@ -0,0 +1,260 @@
+################################################################################
+# Module: memory.py
+# Description: Memory cost of EnergyPlus runs for admission control
+# License: MIT, see full license in LICENSE.txt
+# Web: https://github.com/samuelduchesne/archetypal
+################################################################################
+
+import json
+import os
+import statistics
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+
+from path import Path
+
+from archetypal import settings
+
+KiB = 1024
+MiB = 1024 ** 2
+
+# Classes of the surfaces counted by model_features()
+SURFACE_CLASSES = {
+    "BUILDINGSURFACE:DETAILED",
+    "FENESTRATIONSURFACE:DETAILED",
+    "WALL:DETAILED",
+    "ROOFCEILING:DETAILED",
+    "FLOOR:DETAILED",
+    "WALL:EXTERIOR",
+    "WALL:ADIABATIC",
+    "WALL:UNDERGROUND",
+    "WALL:INTERZONE",
+    "ROOF",
+    "CEILING:ADIABATIC",
+    "CEILING:INTERZONE",
+    "FLOOR:GROUNDCONTACT",
+    "FLOOR:ADIABATIC",
+    "FLOOR:INTERZONE",
+    "WINDOW",
+    "WINDOW:INTERZONE",
+    "DOOR",
+    "DOOR:INTERZONE",
+    "GLAZEDDOOR",
+    "GLAZEDDOOR:INTERZONE",
+}
+OUTPUT_CLASSES = {
+    "OUTPUT:VARIABLE",
+    "OUTPUT:METER",
+    "OUTPUT:METER:METERFILEONLY",
+    "OUTPUT:METER:CUMULATIVE",
+    "OUTPUT:METER:CUMULATIVE:METERFILEONLY",
+}
+
+# Memoized model features keyed by (path, size, mtime_ns).
+_FEATURES = OrderedDict()
+_FEATURES_MAXSIZE = 1024
+
+
+def model_features(idfname):
+    """Count the objects of a model that drive the memory use of EnergyPlus.
+
+    The file is scanned without being parsed with the IDD. Results are memoized
+    on (path, size, mtime_ns), like the digests of
+    :func:`~archetypal.idfclass.util.hash_model`.
+
+    Args:
+        idfname (str or Path): The path of the idf file.
+
+    Returns:
+        dict: The number of "zones", of "surfaces" (including shading surfaces),
+        of "outputs" (variables and meters) and the number of "timesteps" per
+        hour.
+    """
+    from archetypal.idfclass.util import iter_idf_objects
+
+    filename = os.path.abspath(idfname)
+    stat = os.stat(filename)
+    memo_key = (filename, stat.st_size, stat.st_mtime_ns)
+    features = _FEATURES.get(memo_key)
+    if features is not None:
+        return dict(features)
+    features = dict(zones=0, surfaces=0, outputs=0, timesteps=6)
+    for fields in iter_idf_objects(filename):
+        key = fields[0].upper()
+        if key == "ZONE":
+            features["zones"] += 1
+        elif key in SURFACE_CLASSES or key.startswith("SHADING:"):
+            features["surfaces"] += 1
+        elif key in OUTPUT_CLASSES:
+            features["outputs"] += 1
+        elif key == "TIMESTEP" and len(fields) > 1 and fields[1].isdigit():
+            features["timesteps"] = int(fields[1])
+    _FEATURES[memo_key] = dict(features)
+    if len(_FEATURES) > _FEATURES_MAXSIZE:
+        _FEATURES.popitem(last=False)
+    return features
+
+
+def estimate_memory(features):
+    """A rough prior of the peak resident memory of EnergyPlus, in bytes.
+
+    The shading and radiant exchange calculations grow with the square of the
+    number of surfaces. :class:`MemoryHistory` corrects this prior with the
+    peaks measured on this machine.
+
+    Args:
+        features (dict): The features returned by :func:`model_features`.
+    """
+    surfaces = features["surfaces"]
+    return int(
+        100 * MiB
+        + 2 * MiB * features["zones"]
+        + 64 * KiB * surfaces
+        + 64 * surfaces ** 2
+        + 16 * KiB * features["outputs"] * features["timesteps"]
+    )
+
+
+class MemoryHistory:
+    """The peak resident memory measured for the models simulated before.
+
+    The memory cost of a model simulated before is its largest measured peak.
+    The cost of a new model is the prior of :func:`estimate_memory` scaled by the
+    median ratio of the measured peaks to the prior, so that the estimate learns
+    from the runs of this machine. The history is saved to a json file shared by
+    the processes using the same `settings.cache_folder`.
+
+    Args:
+        path (str or Path): The path of the json file.
+        margin (float): The safety factor applied to the costs.
+    """
+
+    def __init__(self, path, margin=1.1):
+        self.path = Path(path).expand()
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._records = None
+        self._mtime = None
+        self._ratio = None  # (mtime of the records, ratio)
+
+    @property
+    def records(self):
+        """dict: {model hash: {"features": dict, "peak_rss": int}}. Reloaded when
+        the file is changed, e.g. by another process."""
+        mtime = os.path.getmtime(self.path) if self.path.exists() else None
+        if self._records is None or mtime != self._mtime:
+            self._records, self._mtime = self._load(), mtime
+        return self._records
+
+    def cost(self, idfname):
+        """The expected peak resident memory of a simulation of `idfname`.
+
+        Args:
+            idfname (str or Path): The path of the idf file.
+
+        Returns:
+            int: The cost in bytes.
+        """
+        from archetypal.idfclass.util import hash_model
+
+        record = self.records.get(hash_model(idfname))
+        if record is not None:
+            return int(record["peak_rss"] * self.margin)
+        estimate = estimate_memory(model_features(idfname))
+        return int(estimate * self.ratio * self.margin)
+
+    @property
+    def ratio(self):
+        """float: Median ratio of the measured peaks to the prior estimates.
+        Computed again only when the records are reloaded."""
+        records = self.records
+        if self._ratio is None or self._ratio[0] != self._mtime:
+            ratios = [
+                record["peak_rss"] / estimate_memory(record["features"])
+                for record in records.values()
+            ]
+            self._ratio = self._mtime, statistics.median(ratios) if ratios else 1.0
+        return self._ratio[1]
+
+    def record(self, idfname, peak_rss):
+        """Record the peak resident memory measured for a simulation.
+
+        Args:
+            idfname (str or Path): The path of the idf file.
+            peak_rss (int): The measured peak, in bytes.
+        """
+        from archetypal.idfclass.util import hash_model
+
+        key = hash_model(idfname)
+        with self._lock:
+            records = self._load()  # merge the records of the other processes
+            previous = records.get(key, {}).get("peak_rss", 0)
+            records[key] = dict(
+                features=model_features(idfname), peak_rss=max(previous, peak_rss)
+            )
+            self.path.dirname().makedirs_p()
+            tmp = self.path + f".{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(records, f)
+            os.replace(tmp, self.path)
+            self._records, self._mtime = records, os.path.getmtime(self.path)
+            self._ratio = None
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+_histories = {}
+
+
+def get_memory_history():
+    """Return the :class:`MemoryHistory` saved in `settings.cache_folder`."""
+    path = (settings.cache_folder / "memory_history.json").expand()
+    if path not in _histories:
+        _histories[path] = MemoryHistory(path)
+    return _histories[path]
+
+
+def memory_cost(spec):
+    """The memory cost of a job of :func:`~archetypal.utils.run_batch` given as
+    the keyword arguments of :class:`~archetypal.idfclass.IDF`.
+
+    Args:
+        spec (dict): The job.
+
+    Returns:
+        int: The cost in bytes; 0 if `spec` is not a model file.
+    """
+    idfname = spec.get("idfname") if isinstance(spec, dict) else None
+    if idfname is None or not os.path.isfile(idfname):
+        return 0
+    return get_memory_history().cost(idfname)
+
+
+def wait_peak_rss(p):
+    """Wait for the :class:`subprocess.Popen` `p` to exit.
+
+    Returns:
+        int: The peak resident memory of the process in bytes, or None if it
+        cannot be measured on this platform.
+    """
+    if not hasattr(os, "wait4"):
+        p.wait()
+        return None
+    try:
+        _, status, usage = os.wait4(p.pid, 0)
+    except ChildProcessError:  # already reaped, e.g. by Popen.poll()
+        p.wait()
+        return None
+    if os.WIFSIGNALED(status):
+        p.returncode = -os.WTERMSIG(status)
+    else:
+        p.returncode = os.WEXITSTATUS(status)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return usage.ru_maxrss * (1 if sys.platform == "darwin" else KiB)
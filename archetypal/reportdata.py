@@ -1,11 +1,15 @@
 """"""
 
 import functools
+import hashlib
+import json
+import os
 import time
+import uuid
 from sqlite3 import OperationalError
 
 import numpy as np
-from pandas import DataFrame, read_sql_query, to_numeric
+from pandas import DataFrame, Series, concat, read_pickle, read_sql_query, to_numeric
 from path import Path
 
 from archetypal import log
@@ -18,6 +22,7 @@ class ReportData(DataFrame):
     REPORTDATAINDEX = "ReportDataIndex"
     TIMEINDEX = "TimeIndex"
     REPORTDATADICTIONARYINDEX = "ReportDataDictionaryIndex"
+    EXTENDEDDATAINDEX = "ReportExtendedDataIndex"
     VALUE = "Value"
     ISMETER = "IsMeter"
     TYPE = "Type"
@@ -45,6 +50,50 @@ class ReportData(DataFrame):
             )
         )
 
+    # Maximum number of parameters of a query (SQLITE_MAX_VARIABLE_NUMBER)
+    MAX_PARAMETERS = 999
+
+    # Columns of the tables joined by from_sqlite(), in the order they are returned
+    TIME_COLUMNS = [
+        "Month",
+        "Day",
+        "Hour",
+        "Minute",
+        "Dst",
+        "Interval",
+        "IntervalType",
+        "SimulationDays",
+        "DayType",
+        "EnvironmentPeriodIndex",
+        "WarmupFlag",
+    ]
+    DICTIONARY_COLUMNS = [
+        "IsMeter",
+        "Type",
+        "IndexGroup",
+        "TimestepType",
+        "KeyValue",
+        "Name",
+        "ReportingFrequency",
+        "ScheduleName",
+        "Units",
+    ]
+    EXTENDED_DATA_COLUMNS = [
+        "ReportExtendedDataIndex",
+        "MaxValue",
+        "MaxMonth",
+        "MaxDay",
+        "MaxHour",
+        "MaxStartMinute",
+        "MaxMinute",
+        "MinValue",
+        "MinMonth",
+        "MinDay",
+        "MinHour",
+        "MinStartMinute",
+        "MinMinute",
+    ]
+
     @classmethod
     def from_sqlite(
         cls,
@@ -52,16 +101,33 @@ class ReportData(DataFrame):
         table_name,
         warmup_flag=0,
         environment_type=3,
+        key_value=None,
+        reporting_frequency=None,
+        extended_data=False,
     ):
         """Read an EnergyPlus eplusout.sql file.
 
+        The requested variables are first resolved to their
+        ReportDataDictionaryIndex, so that only their rows of the ReportData
+        table are read, and only the range of the Time table they span is
+        joined. Only the ReportExtendedDataIndex of the ReportExtendedData table
+        is joined, unless `extended_data` is True. If the sql file has a :class:`ReportDataSidecar`, the data is
+        read from the sidecar instead.
+
         Args:
-            sqlite_file (str): The path of the sqlite3 file.
+            sqlite_file (str or Path): The path of the sqlite3 file.
             table_name (str, optional): Filter results by a specific table name.
             warmup_flag (int): 1 during warmup, 0 otherwise. Defaults to 0.
             environment_type (int): An enumeration of the environment type. (1 = Design
                 Day, 2 = Design Run Period, 3 = Weather Run Period) See the various
                 SizingPeriod objects and the RunPeriod object for details.
+            key_value (str or list, optional): Filter results by key value, e.g. a
+                zone name.
+            reporting_frequency (str or list, optional): Filter results by
+                reporting frequency, e.g. "Hourly".
+            extended_data (bool): If True, the columns of the ReportExtendedData
+                table (the minimum and maximum values of variables reported at a
+                daily or coarser frequency) are joined.
 
         Examples:
             >>> ReportData.from_sqlite("eplusout.sql",
@@ -73,68 +139,319 @@ class ReportData(DataFrame):
         Returns:
             ReportData: a :class:`ReportData` which is a subclass of :class:`DataFrame`.
         """
-        if not isinstance(sqlite_file, str):
-            raise TypeError("Please provide a str, not a {}".format(type(sqlite_file)))
-        file = Path(sqlite_file)
-        if not file.exists():
-            raise FileNotFoundError("Could not find sql file {}".format(file.relpath()))
+        if not isinstance(sqlite_file, (str, os.PathLike)):
+            raise TypeError(
+                "Please provide a str or path, not a {}".format(type(sqlite_file))
+            )
+        sqlite_file = Path(sqlite_file)
+        if not sqlite_file.exists():
+            raise FileNotFoundError(
+                "Could not find sql file {}".format(sqlite_file.relpath())
+            )
+
+        sidecar = None if extended_data else ReportDataSidecar.open(sqlite_file)
+        if sidecar is not None:
+            return cls(
+                sidecar.to_reportdata(
+                    table_name,
+                    warmup_flag,
+                    environment_type,
+                    key_value,
+                    reporting_frequency,
+                )
+            )
 
         import sqlite3
 
         # create database connection with sqlite3
         with sqlite3.connect(sqlite_file) as conn:
-            # empty dict to hold all DataFrames
-            all_tables = {}
-            # Iterate over all tables in the report_tables list
-            sql_query = f"""
-            SELECT rd.ReportDataIndex,
-                   rd.TimeIndex,
-                   rd.ReportDataDictionaryIndex,
-                   red.ReportExtendedDataIndex,
-                   t.Month,
-                   t.Day,
-                   t.Hour,
-                   t.Minute,
-                   t.Dst,
-                   t.Interval,
-                   t.IntervalType,
-                   t.SimulationDays,
-                   t.DayType,
-                   t.EnvironmentPeriodIndex,
-                   t.WarmupFlag,
-                   p.EnvironmentType,
-                   rd.Value,
-                   rdd.IsMeter,
-                   rdd.Type,
-                   rdd.IndexGroup,
-                   rdd.TimestepType,
-                   rdd.KeyValue,
-                   rdd.Name,
-                   rdd.ReportingFrequency,
-                   rdd.ScheduleName,
-                   rdd.Units
-            FROM ReportData As rd
-                    INNER JOIN ReportDataDictionary As rdd ON rd.ReportDataDictionaryIndex = rdd.ReportDataDictionaryIndex
-                    LEFT OUTER JOIN ReportExtendedData As red ON rd.ReportDataIndex = red.ReportDataIndex
-                    INNER JOIN Time As t ON rd.TimeIndex = t.TimeIndex
-                    JOIN EnvironmentPeriods as p ON t.EnvironmentPeriodIndex = p.EnvironmentPeriodIndex
-            WHERE (IFNULL(t.WarmupFlag, 0) = @warmup_flag);
-            """
-            params = {"warmup_flag": warmup_flag}
-            if table_name:
-                conditions, table_name = cls.multiple_conditions(
-                    "table_name", table_name, "Name"
+            dictionary = cls._read_dictionary(
+                conn, table_name, key_value, reporting_frequency
+            )
+            if dictionary.empty:
+                return cls(columns=cls._columns(extended_data))
+
+            # Read only the rows of the requested variables
+            report_data = concat(
+                [
+                    cls.execute(conn, sql_query, params)
+                    for sql_query, params in cls._report_data_queries(
+                        dictionary, table_name or key_value or reporting_frequency
+                    )
+                ],
+                ignore_index=True,
+            )
+            if report_data.empty:
+                return cls(columns=cls._columns(extended_data))
+
+            # Join only the range of the Time table spanned by these rows
+            times = cls._read_times(
+                conn,
+                warmup_flag,
+                environment_type,
+                first=int(report_data.TimeIndex.min()),
+                last=int(report_data.TimeIndex.max()),
+            )
+            df = cls._join(report_data, times, dictionary)
+            df = cls._join_extended(conn, df, extended_data)
+            return cls(df[cls._columns(extended_data)])
+
+    @classmethod
+    def iter_sqlite(
+        cls,
+        sqlite_file,
+        table_name=None,
+        chunksize=500000,
+        warmup_flag=0,
+        environment_type=3,
+        key_value=None,
+        reporting_frequency=None,
+    ):
+        """Read an EnergyPlus eplusout.sql file in chunks.
+
+        Same as :meth:`from_sqlite`, but the rows of the ReportData table are
+        streamed, so that outputs that do not fit in memory can be processed.
+        Only the Time and ReportDataDictionary tables are loaded in full.
+
+        Args:
+            sqlite_file (str or Path): The path of the sqlite3 file.
+            table_name (str or list, optional): Filter results by a specific
+                table name. If None, all variables and meters are read.
+            chunksize (int): The maximum number of rows of a chunk.
+            warmup_flag (int): 1 during warmup, 0 otherwise. Defaults to 0.
+            environment_type (int): An enumeration of the environment type. (1 = Design
+                Day, 2 = Design Run Period, 3 = Weather Run Period).
+            key_value (str or list, optional): Filter results by key value.
+            reporting_frequency (str or list, optional): Filter results by
+                reporting frequency.
+
+        Examples:
+            >>> for chunk in ReportData.iter_sqlite("eplusout.sql", chunksize=10**6):
+            >>>     chunk.to_parquet(...)
+
+        Yields:
+            ReportData: Chunks of at most `chunksize` rows, in the order of the
+            ReportData table.
+        """
+        if not isinstance(sqlite_file, (str, os.PathLike)):
+            raise TypeError(
+                "Please provide a str or path, not a {}".format(type(sqlite_file))
+            )
+        sqlite_file = Path(sqlite_file)
+        if not sqlite_file.exists():
+            raise FileNotFoundError(
+                "Could not find sql file {}".format(sqlite_file.relpath())
+            )
+
+        import sqlite3
+
+        conn = sqlite3.connect(sqlite_file)
+        try:
+            dictionary = cls._read_dictionary(
+                conn, table_name, key_value, reporting_frequency
+            )
+            if dictionary.empty:
+                return
+            times = cls._read_times(conn, warmup_flag, environment_type)
+            for sql_query, params in cls._report_data_queries(
+                dictionary, table_name or key_value or reporting_frequency
+            ):
+                for report_data in read_sql_query(
+                    sql_query, conn, params=params, chunksize=chunksize
+                ):
+                    df = cls._join(report_data, times, dictionary)
+                    if not df.empty:
+                        df = cls._join_extended(conn, df)
+                        yield cls(df[cls._columns()])
+        finally:
+            conn.close()
+
+    # Time columns grouped by for each period of aggregate_sqlite()
+    PERIODS = {
+        None: [],
+        "Month": ["Month"],
+        "Day": ["Month", "Day"],
+        "Hour": ["Month", "Day", "Hour"],
+    }
+
+    @classmethod
+    def aggregate_sqlite(
+        cls,
+        sqlite_file,
+        table_name=None,
+        how="sum",
+        period=None,
+        by=("Name", "KeyValue"),
+        **kwargs,
+    ):
+        """Aggregate the variables of an EnergyPlus eplusout.sql file by key and
+        period, in constant memory.
+
+        The rows are read in chunks with :meth:`iter_sqlite`; only the partial
+        aggregates of each group are kept in memory between chunks.
+
+        Args:
+            sqlite_file (str or Path): The path of the sqlite3 file.
+            table_name (str or list, optional): Filter results by a specific
+                table name. If None, all variables and meters are aggregated.
+            how (str or list): Aggregation(s) among "sum", "mean", "max", "min"
+                and "count".
+            period (str, optional): Aggregate by "Month", "Day" or "Hour". If None,
+                the whole simulation is aggregated.
+            by (tuple): Columns identifying a key. Filter `reporting_frequency`
+                if a variable is reported at more than one frequency.
+            **kwargs: Keyword arguments of :meth:`iter_sqlite`, e.g. `chunksize`.
+
+        Examples:
+            >>> ReportData.aggregate_sqlite("eplusout.sql",
+            >>>     table_name="Zone Air Temperature", how=["mean", "max"],
+            >>>     period="Month",
+            >>> )
+
+        Returns:
+            DataFrame or Series: The aggregate(s), indexed by `by` and the Time
+            columns of the period.
+        """
+        if period not in cls.PERIODS:
+            raise ValueError(
+                f"period must be one of {list(cls.PERIODS)}, not '{period}'"
+            )
+        keys = list(by) + cls.PERIODS[period]
+        combine = {"sum": "sum", "count": "sum", "max": "max", "min": "min"}
+        partials = None
+        for chunk in cls.iter_sqlite(sqlite_file, table_name, **kwargs):
+            partial = chunk.groupby(keys).Value.agg(list(combine))
+            if partials is not None:
+                partial = concat([partials, partial]).groupby(level=keys).agg(combine)
+            partials = partial
+        if partials is None:
+            partials = DataFrame(columns=list(combine))
+        partials["mean"] = partials["sum"] / partials["count"]
+        return partials[how]
+
+    @classmethod
+    def _read_dictionary(cls, conn, table_name, key_value, reporting_frequency):
+        """The rows of the ReportDataDictionary table of the requested variables."""
+        sql_query = "SELECT * FROM ReportDataDictionary;"
+        params = {}
+        for basename, cond_names, var_name in [
+            ("table_name", table_name, "Name"),
+            ("key_value", key_value, "KeyValue"),
+            ("frequency", reporting_frequency, "ReportingFrequency"),
+        ]:
+            if cond_names:
+                conditions, cond_names = cls.multiple_conditions(
+                    basename, cond_names, var_name
                 )
-                sql_query = sql_query.replace(";", """ AND (%s);""" % conditions)
-                params.update(table_name)
-            if environment_type:
-                conditions, env_name = cls.multiple_conditions(
-                    "env_name", environment_type, "EnvironmentType"
+                sql_query = sql_query.replace(
+                    ";", " %s (%s);" % ("AND" if params else "WHERE", conditions)
                 )
-                sql_query = sql_query.replace(";", """ AND (%s);""" % conditions)
-                params.update(env_name)
-            df = cls.execute(conn, sql_query, params)
-            return cls(df)
+                params.update(cond_names)
+        return cls.execute(conn, sql_query, params)
+
+    @classmethod
+    def _report_data_queries(cls, dictionary, filtered):
+        """The (query, params) reading the ReportData rows of the variables of
+        `dictionary`, or all the rows if not `filtered`."""
+        sql_query = """
+        SELECT ReportDataIndex, TimeIndex, ReportDataDictionaryIndex, Value
+        FROM ReportData;
+        """
+        if not filtered:
+            return [(sql_query, {})]
+        indices = dictionary[cls.REPORTDATADICTIONARYINDEX].tolist()
+        chunks = [
+            indices[i : i + cls.MAX_PARAMETERS]
+            for i in range(0, len(indices), cls.MAX_PARAMETERS)
+        ]
+        return [
+            (
+                sql_query.replace(
+                    ";",
+                    " WHERE ReportDataDictionaryIndex IN (%s);"
+                    % ", ".join("?" * len(chunk)),
+                ),
+                chunk,
+            )
+            for chunk in chunks
+        ]
+
+    @classmethod
+    def _read_times(cls, conn, warmup_flag, environment_type, first=None, last=None):
+        """The rows of the Time table, with the type of their environment, between
+        the TimeIndex `first` and `last`. A `warmup_flag` of None selects both
+        warmup and simulation rows."""
+        sql_query = f"""
+        SELECT t.TimeIndex, {", ".join("t." + c for c in cls.TIME_COLUMNS)},
+               p.EnvironmentType
+        FROM Time As t
+                JOIN EnvironmentPeriods as p ON t.EnvironmentPeriodIndex = p.EnvironmentPeriodIndex
+        WHERE 1;
+        """
+        params = {}
+        if warmup_flag is not None:
+            sql_query = sql_query.replace(
+                ";", " AND (IFNULL(t.WarmupFlag, 0) = @warmup_flag);"
+            )
+            params.update(warmup_flag=warmup_flag)
+        if first is not None:
+            sql_query = sql_query.replace(
+                ";", " AND (t.TimeIndex BETWEEN @first AND @last);"
+            )
+            params.update(first=first, last=last)
+        if environment_type:
+            conditions, env_name = cls.multiple_conditions(
+                "env_name", environment_type, "EnvironmentType"
+            )
+            sql_query = sql_query.replace(";", """ AND (%s);""" % conditions)
+            params.update(env_name)
+        return cls.execute(conn, sql_query, params)
+
+    @classmethod
+    def _join(cls, report_data, times, dictionary):
+        """Join the Time and ReportDataDictionary rows to ReportData rows."""
+        df = report_data.merge(times, on=cls.TIMEINDEX).merge(
+            dictionary, on=cls.REPORTDATADICTIONARYINDEX
+        )
+        return df.sort_values(cls.REPORTDATAINDEX).reset_index(drop=True)
+
+    @classmethod
+    def _join_extended(cls, conn, df, extended_data=False):
+        """Join the ReportExtendedDataIndex of the rows of `df`, and the other
+        columns of the ReportExtendedData table if `extended_data`."""
+        columns = cls._extended_columns(extended_data)
+        sql_query = (
+            f"SELECT ReportDataIndex, {', '.join(columns)} FROM ReportExtendedData "
+            "WHERE ReportDataIndex BETWEEN @first AND @last;"
+        )
+        params = {"first": 0, "last": -1}
+        if not df.empty:
+            params = {
+                "first": int(df.ReportDataIndex.min()),
+                "last": int(df.ReportDataIndex.max()),
+            }
+        extended = cls.execute(conn, sql_query, params)
+        return df.merge(extended, on=cls.REPORTDATAINDEX, how="left")
+
+    @classmethod
+    def _extended_columns(cls, extended_data=False):
+        """The columns of the ReportExtendedData table in a ReportData."""
+        return cls.EXTENDED_DATA_COLUMNS if extended_data else [cls.EXTENDEDDATAINDEX]
+
+    @classmethod
+    def _columns(cls, extended_data=False):
+        """The columns of a ReportData read by :meth:`from_sqlite` and
+        :meth:`iter_sqlite`."""
+        return [
+            cls.REPORTDATAINDEX,
+            cls.TIMEINDEX,
+            cls.REPORTDATADICTIONARYINDEX,
+            *cls._extended_columns(extended_data),
+            *cls.TIME_COLUMNS,
+            "EnvironmentType",
+            cls.VALUE,
+            *cls.DICTIONARY_COLUMNS,
+        ]
 
     @staticmethod
     def multiple_conditions(basename, cond_names, var_name):
@@ -378,6 +695,266 @@ class ReportData(DataFrame):
             return filtered_df.__finalize__(self)
 
 
+class ReportDataSidecar:
+    """A columnar copy of the report data of an EnergyPlus sql file.
+
+    The values of each entry of the ReportDataDictionary are stored as one
+    contiguous float array, with the TimeIndex of each value, in .npy files that
+    are memory mapped when read; the dictionary, the Time table (the shared
+    time axis) and the ReportExtendedDataIndex of the rows are stored as pickled
+    DataFrames. The sidecar is a folder next to
+    the sql file, e.g. "eplusout.sql.columns", and is ignored once the sql file
+    changes.
+
+    Args:
+        path (str or Path): The folder of the sidecar.
+    """
+
+    SUFFIX = ".columns"
+    START, STOP = "Start", "Stop"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.dictionary = read_pickle(self.path / "dictionary.pkl")
+        self.times = read_pickle(self.path / "times.pkl")
+        self.extended = read_pickle(self.path / "extended.pkl")
+        self.row_index = np.load(self.path / "row_index.npy", mmap_mode="r")
+        self.time_index = np.load(self.path / "time_index.npy", mmap_mode="r")
+        self.values = np.load(self.path / "values.npy", mmap_mode="r")
+
+    @classmethod
+    def path_of(cls, sqlite_file):
+        """Path: The folder of the sidecar of `sqlite_file`."""
+        return Path(str(sqlite_file) + cls.SUFFIX)
+
+    @classmethod
+    def open(cls, sqlite_file):
+        """Open the sidecar of `sqlite_file`.
+
+        Returns:
+            ReportDataSidecar: The sidecar, or None if it does not exist or was
+            written for another version of the sql file.
+        """
+        path = cls.path_of(sqlite_file)
+        try:
+            with open(path / "signature.json", "r") as f:
+                signature = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if signature != _signature(sqlite_file):
+            return None
+        try:
+            return cls(path)
+        except OSError:
+            return None  # written by an older version
+
+    @classmethod
+    def write(cls, sqlite_file, chunksize=500000):
+        """Write the sidecar of `sqlite_file`.
+
+        The ReportData table is streamed in chunks of `chunksize` rows, and the
+        values of each chunk are scattered to the memory mapped arrays of their
+        entries, so that memory use is bounded whatever the size of the table.
+
+        Args:
+            sqlite_file (str or Path): The path of the sqlite3 file.
+            chunksize (int): The number of rows read at a time.
+
+        Returns:
+            Path: The folder of the sidecar.
+        """
+        import sqlite3
+
+        path = cls.path_of(sqlite_file)
+        tmp = Path(f"{path}.{uuid.uuid4().hex}.tmp").makedirs_p()
+        with sqlite3.connect(sqlite_file) as conn:
+            dictionary = ReportData.execute(
+                conn, "SELECT * FROM ReportDataDictionary;", {}
+            )
+            counts = ReportData.execute(
+                conn,
+                "SELECT ReportDataDictionaryIndex, COUNT(*) AS Count FROM "
+                "ReportData GROUP BY ReportDataDictionaryIndex;",
+                {},
+            )
+            counts = (
+                counts.set_index(ReportData.REPORTDATADICTIONARYINDEX)
+                .Count.reindex(dictionary[ReportData.REPORTDATADICTIONARYINDEX])
+                .fillna(0)
+                .astype("int64")
+                .values
+            )
+            stops = np.cumsum(counts)
+            dictionary[cls.START], dictionary[cls.STOP] = stops - counts, stops
+            position = Series(
+                np.arange(len(dictionary)),
+                index=dictionary[ReportData.REPORTDATADICTIONARYINDEX],
+            )
+            total = int(stops[-1]) if len(stops) else 0
+            arrays = {
+                name: np.lib.format.open_memmap(
+                    tmp / f"{name}.npy", mode="w+", dtype=dtype, shape=(total,)
+                )
+                for name, dtype in [
+                    ("row_index", "int64"),
+                    ("time_index", "int64"),
+                    ("values", "float64"),
+                ]
+            }
+            cursor = dictionary[cls.START].values.copy()
+            for chunk in read_sql_query(
+                "SELECT ReportDataIndex, TimeIndex, ReportDataDictionaryIndex, "
+                "Value FROM ReportData;",
+                conn,
+                chunksize=chunksize,
+            ):
+                entries = position.reindex(
+                    chunk[ReportData.REPORTDATADICTIONARYINDEX]
+                ).values
+                order = np.argsort(entries, kind="stable")
+                entries = entries[order]
+                unique, first, count = np.unique(
+                    entries, return_index=True, return_counts=True
+                )
+                # destination = next free slot of the entry + rank in the chunk
+                destination = (
+                    cursor[entries] + np.arange(len(entries)) - np.repeat(first, count)
+                )
+                for name, column in [
+                    ("row_index", ReportData.REPORTDATAINDEX),
+                    ("time_index", ReportData.TIMEINDEX),
+                    ("values", ReportData.VALUE),
+                ]:
+                    arrays[name][destination] = chunk[column].values[order]
+                cursor[unique] += count
+            for array in arrays.values():
+                array.flush()
+            del arrays
+            ReportData._read_times(conn, None, None).to_pickle(tmp / "times.pkl")
+            ReportData.execute(
+                conn,
+                "SELECT ReportDataIndex, ReportExtendedDataIndex FROM "
+                "ReportExtendedData;",
+                {},
+            ).to_pickle(tmp / "extended.pkl")
+        dictionary.to_pickle(tmp / "dictionary.pkl")
+        with open(tmp / "signature.json", "w") as f:
+            json.dump(_signature(sqlite_file), f)
+        # Move the previous sidecar aside before moving the new one in, so that
+        # a concurrent reader finds either a complete sidecar or none at all.
+        old = Path(f"{path}.{uuid.uuid4().hex}.old")
+        try:
+            os.replace(path, old)
+        except FileNotFoundError:
+            old = None
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            # Another process moved its sidecar in first
+            tmp.rmtree_p()
+        if old is not None:
+            # Files still memory mapped by a reader may not be removable yet
+            old.rmtree(ignore_errors=True)
+        log(f"Wrote the report data of '{sqlite_file}' to '{path}'")
+        return path
+
+    def series(self, report_data_dictionary_index):
+        """The values of an entry of the ReportDataDictionary.
+
+        The arrays are views of the memory mapped files; no data is copied.
+
+        Args:
+            report_data_dictionary_index (int): The ReportDataDictionaryIndex.
+
+        Returns:
+            tuple: The (TimeIndex, Value) arrays of the entry.
+
+        Raises:
+            KeyError: If the entry is not in the ReportDataDictionary.
+        """
+        positions = np.flatnonzero(
+            self.dictionary[ReportData.REPORTDATADICTIONARYINDEX].values
+            == report_data_dictionary_index
+        )
+        if len(positions) != 1:
+            raise KeyError(
+                f"no ReportDataDictionaryIndex {report_data_dictionary_index} in "
+                f"the sidecar '{self.path}'"
+            )
+        (position,) = positions
+        start, stop = self.dictionary[[self.START, self.STOP]].values[position]
+        return self.time_index[start:stop], self.values[start:stop]
+
+    def to_reportdata(
+        self,
+        table_name=None,
+        warmup_flag=0,
+        environment_type=3,
+        key_value=None,
+        reporting_frequency=None,
+    ):
+        """Read the report data of the sidecar. Same as
+        :meth:`ReportData.from_sqlite`.
+
+        Returns:
+            ReportData: a :class:`ReportData` which is a subclass of :class:`DataFrame`.
+        """
+        dictionary = self.dictionary
+        for column, names in [
+            (ReportData.NAME, table_name),
+            (ReportData.KEYVALUE, key_value),
+            (ReportData.REPORTINGFREQUENCY, reporting_frequency),
+        ]:
+            if names:
+                if not isinstance(names, (list, tuple)):
+                    names = [names]
+                dictionary = dictionary[dictionary[column].isin(names)]
+        times = self.times
+        if warmup_flag is not None:
+            times = times[times.WarmupFlag.fillna(0) == warmup_flag]
+        if environment_type:
+            if not isinstance(environment_type, (list, tuple)):
+                environment_type = [environment_type]
+            times = times[times.EnvironmentType.isin(environment_type)]
+        slices = [
+            slice(start, stop)
+            for start, stop in dictionary[[self.START, self.STOP]].values
+        ]
+        report_data = DataFrame(
+            {
+                ReportData.REPORTDATAINDEX: _take(self.row_index, slices),
+                ReportData.TIMEINDEX: _take(self.time_index, slices),
+                ReportData.REPORTDATADICTIONARYINDEX: np.repeat(
+                    dictionary[ReportData.REPORTDATADICTIONARYINDEX].values,
+                    (dictionary[self.STOP] - dictionary[self.START]).values,
+                ),
+                ReportData.VALUE: _take(self.values, slices),
+            }
+        )
+        df = ReportData._join(
+            report_data, times, dictionary.drop(columns=[self.START, self.STOP])
+        ).merge(self.extended, on=ReportData.REPORTDATAINDEX, how="left")
+        return ReportData(df[ReportData._columns()])
+
+
+def _take(array, slices):
+    """Concatenate the `slices` of `array`."""
+    if not slices:
+        return array[:0].copy()
+    return np.concatenate([array[s] for s in slices])
+
+
+def _signature(sqlite_file):
+    """The size and the header of an sqlite3 file. The header holds a counter
+    incremented each time the database is changed."""
+    with open(sqlite_file, "rb") as f:
+        header = f.read(100)
+    return dict(
+        size=os.path.getsize(sqlite_file),
+        header=hashlib.sha1(header).hexdigest(),
+    )
+
+
 def conjunction(*conditions, logical=np.logical_and):
     """Apply a logical function on n conditions."""
     return functools.reduce(logical, conditions)
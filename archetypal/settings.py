@@ -23,6 +23,29 @@ umitemplate = Path("data/BostonTemplateLibrary.json")
 # cache server responses
 use_cache = False
 
+# disk budget (in bytes) of the simulation results cache. When exceeded, the least
+# recently used results are evicted. None means no limit.
+cache_size_limit = None
+
+# local fast folder (e.g. "/dev/shm") in which the simulation programs are run.
+# The retained outputs are then published to the output directory of the model.
+# None runs the programs in the output directory.
+scratch_folder = None
+
+# free space (in bytes) required in scratch_folder to run a program there. Below
+# this, the run spills over to the output directory of the model.
+scratch_min_free = 2 * 1024 ** 3
+
+# memory (in bytes) available to the simulations run concurrently by run_batch().
+# Jobs are admitted while the sum of their estimated memory costs fits the budget.
+# None only limits the number of concurrent simulations to the number of workers.
+memory_budget = None
+
+# if True, the report data of the eplusout.sql of each simulation is also written
+# to a columnar sidecar (see reportdata.ReportDataSidecar) that ReportData reads
+# instead of querying the sql file.
+report_sidecar = False
+
 # Debug behavior
 debug = False
 
@@ -8,7 +8,6 @@
 import collections
 import logging as lg
 import math
-import sqlite3
 from enum import Enum
 
 import numpy as np
@@ -583,18 +582,18 @@ class ZoneConditioning(UmiBase):
         Returns:
             4-tuple: (IsMechVentOn, MinFreshAirPerArea, MinFreshAirPerPerson, MechVentSchedule)
         """
-        import sqlite3
-
         import pandas as pd
 
-        # create database connection with sqlite3
-        with sqlite3.connect(zone.idf.sql_file) as conn:
-            sql_query = f"""
+        # shared read-only database connection of this thread
+        with zone.idf.sql_connections.connection() as conn:
+            sql_query = """
                         select t.ColumnName, t.Value
                         from TabularDataWithStrings t
-                        where TableName == 'Minimum Outdoor Air During Occupied Hours' and RowName == '{zone.Name.upper()}'"""
+                        where TableName == 'Minimum Outdoor Air During Occupied Hours' and RowName == ?"""
             oa = (
-                pd.read_sql_query(sql_query, con=conn, coerce_float=True)
+                pd.read_sql_query(
+                    sql_query, con=conn, params=(zone.Name.upper(),), coerce_float=True
+                )
                 .set_index("ColumnName")
                 .squeeze()
             )
@@ -716,18 +715,21 @@ class ZoneConditioning(UmiBase):
         """
         # Set Thermostat set points
         # Heating and Cooling set points and schedules
-        with sqlite3.connect(zone.idf.sql_file) as conn:
-            sql_query = f"""
+        with zone.idf.sql_connections.connection() as conn:
+            sql_query = """
                     SELECT t.ReportVariableDataDictionaryIndex
                     FROM ReportVariableDataDictionary t
-                    WHERE VariableName == 'Zone Thermostat Heating Setpoint Temperature' and KeyValue == '{zone.Name.upper()}';"""
-            index = conn.execute(sql_query).fetchone()
+                    WHERE VariableName == ? and KeyValue == ?;"""
+            index = conn.execute(
+                sql_query,
+                ("Zone Thermostat Heating Setpoint Temperature", zone.Name.upper()),
+            ).fetchone()
             if index:
-                sql_query = f"""
+                sql_query = """
                         SELECT t.VariableValue
                         FROM ReportVariableData t
-                        WHERE ReportVariableDataDictionaryIndex == {index[0]};"""
-                h_array = conn.execute(sql_query).fetchall()
+                        WHERE ReportVariableDataDictionaryIndex == ?;"""
+                h_array = conn.execute(sql_query, (index[0],)).fetchall()
                 if h_array:
                     heating_setpoints = np.array(h_array).flatten()
                     heating_sched = UmiSchedule.from_values(
@@ -740,17 +742,20 @@ class ZoneConditioning(UmiBase):
                 else:
                     heating_sched = None
 
-            sql_query = f"""
+            sql_query = """
                     SELECT t.ReportVariableDataDictionaryIndex
                     FROM ReportVariableDataDictionary t
-                    WHERE VariableName == 'Zone Thermostat Cooling Setpoint Temperature' and KeyValue == '{zone.Name.upper()}';"""
-            index = conn.execute(sql_query).fetchone()
+                    WHERE VariableName == ? and KeyValue == ?;"""
+            index = conn.execute(
+                sql_query,
+                ("Zone Thermostat Cooling Setpoint Temperature", zone.Name.upper()),
+            ).fetchone()
             if index:
-                sql_query = f"""
+                sql_query = """
                         SELECT t.VariableValue
                         FROM ReportVariableData t
-                        WHERE ReportVariableDataDictionaryIndex == {index[0]};"""
-                c_array = conn.execute(sql_query).fetchall()
+                        WHERE ReportVariableDataDictionaryIndex == ?;"""
+                c_array = conn.execute(sql_query, (index[0],)).fetchall()
                 if c_array:
                     cooling_setpoints = np.array(c_array).flatten()
                     cooling_sched = UmiSchedule.from_values(
@@ -7,7 +7,6 @@
 
 import collections
 import logging as lg
-import sqlite3
 from enum import Enum
 
 import pandas as pd
@@ -246,8 +245,8 @@ class ZoneLoad(UmiBase):
         # Get schedule index for different loads and create ZoneLoad arguments
         # Verify if Equipment in zone
 
-        # create database connection with sqlite3
-        with sqlite3.connect(str(zone.idf.sql_file)) as conn:
+        # shared read-only database connection of this thread
+        with zone.idf.sql_connections.connection() as conn:
             sql_query = "select ifnull(ZoneIndex, null) from Zones where ZoneName=?"
             t = (zone.Name.upper(),)
             c = conn.cursor()
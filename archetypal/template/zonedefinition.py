@@ -8,7 +8,6 @@
 import collections
 import functools
 import math
-import sqlite3
 import time
 from operator import add
 
@@ -146,6 +145,9 @@ class ZoneDefinition(UmiBase):
         Returns (float): zone's area in m²
         """
         if self._area is None:
+            if self._epbunch is not None:
+                surfaces = self._surface_geometry()
+                return surfaces.area[surfaces.Surface_Type.str.upper() == "FLOOR"].sum()
             zone_surfs = self.zonesurfaces(
                 exclude=["INTERNALMASS", "WINDOWSHADINGCONTROL"]
             )
@@ -166,6 +168,9 @@ class ZoneDefinition(UmiBase):
         Returns (float): zone's volume in m³
         """
         if not self._volume:
+            if self._epbunch is not None:
+                surfaces = self._surface_geometry()
+                return (surfaces.volume * surfaces.Multiplier).sum()
             zone_surfs = self.zonesurfaces(
                 exclude=["INTERNALMASS", "WINDOWSHADINGCONTROL"]
             )
@@ -185,6 +190,10 @@ class ZoneDefinition(UmiBase):
     def volume(self, value):
         self._volume = value
 
+    def _surface_geometry(self):
+        """Rows of :attr:`IDF.geometry` for the detailed surfaces of this zone."""
+        return self._epbunch.theidf.zone_geometry(self._epbunch.Name)
+
     def zonesurfaces(self, exclude=None):
         """Returns list of surfaces belonging to this zone. Optionally filter
         surface types.
@@ -209,9 +218,7 @@ class ZoneDefinition(UmiBase):
         zone loads, and energy consumed by internal gains.
         """
         if self._multiplier is None:
-            with sqlite3.connect(self.idf.sql_file) as conn:
-                sql_query = "SELECT t.Value FROM TabularDataWithStrings t WHERE TableName='Zone Summary' and ColumnName='Multipliers' and RowName=?"
-                (res,) = conn.execute(sql_query, (self.Name.upper(),)).fetchone()
+            res = self.idf.sql_connections.zone_summary(self.Name, "Multipliers")
             self._multiplier = int(float(res))
         return self._multiplier
 
@@ -223,23 +230,20 @@ class ZoneDefinition(UmiBase):
     def is_part_of_conditioned_floor_area(self):
         """Returns True if zone is conditioned"""
         if self._is_part_of_conditioned_floor_area is None:
-            with sqlite3.connect(self.idf.sql_file) as conn:
-                sql_query = (
-                    "SELECT t.Value FROM TabularDataWithStrings t WHERE TableName='Zone Summary' and ColumnName='Conditioned (Y/N)' and RowName=?"
-                    ""
-                )
-                res = conn.execute(sql_query, (self.Name.upper(),)).fetchone()
-            self._is_part_of_conditioned_floor_area = "Yes" in res
+            res = self.idf.sql_connections.zone_summary(
+                self.Name, "Conditioned (Y/N)"
+            )
+            self._is_part_of_conditioned_floor_area = res == "Yes"
         return self._is_part_of_conditioned_floor_area
 
     @property
     def is_part_of_total_floor_area(self):
         """Returns True if zone is part of the total floor area"""
         if self._is_part_of_total_floor_area is None:
-            with sqlite3.connect(self.idf.sql_file) as conn:
-                sql_query = "SELECT t.Value FROM TabularDataWithStrings t WHERE TableName='Zone Summary' and ColumnName='Part of Total Floor Area (Y/N)' and RowName=?"
-                res = conn.execute(sql_query, (self.Name.upper(),)).fetchone()
-            self._is_part_of_total_floor_area = "Yes" in res
+            res = self.idf.sql_connections.zone_summary(
+                self.Name, "Part of Total Floor Area (Y/N)"
+            )
+            self._is_part_of_total_floor_area = res == "Yes"
         return self._is_part_of_total_floor_area
 
     @staticmethod
@@ -630,7 +634,9 @@ def resolve_obco(this):
         return None, adj_zone
 
     elif obc.upper() == "SURFACE":
-        obco = this.get_referenced_object("Outside_Boundary_Condition_Object")
+        obco = this.theidf.get_referenced_object(
+            this, "Outside_Boundary_Condition_Object"
+        )
         adj_zone = obco.theidf.getobject("ZONE", obco.Zone_Name)
         return obco, adj_zone
     else:
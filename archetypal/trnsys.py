@@ -1242,6 +1242,7 @@ def clear_name_idf_objects(idfFile, log_clear_names=False, **kwargs):
     uniqueList = []
     old_name_list = []
     old_new_eq = {}
+    renames = {}
 
     # For all categories of objects in the IDF file
     for obj in tqdm(idfFile.idfobjects, desc="Cleaning names", **kwargs):
@@ -1262,6 +1263,9 @@ def clear_name_idf_objects(idfFile, log_clear_names=False, **kwargs):
             if not fenestration:
                 try:
                     old_name = epObject.Name
+                    if (obj, old_name.upper()) in renames or not old_name:
+                        # Duplicated or empty name; cannot be referred to.
+                        continue
                     # For TRNBuild compatibility we oblige the new name to
                     # begin by a lowercase letter and the new name is max 10
                     # characters. The new name is done with the uppercase of
@@ -1290,13 +1294,25 @@ def clear_name_idf_objects(idfFile, log_clear_names=False, **kwargs):
                     old_name_list.append(old_name)
                     old_new_eq[new_name.upper()] = old_name.upper()
 
-                    # Changing the name in the IDF object
-                    idfFile.rename(obj, old_name, new_name)
+                    renames[(obj, old_name.upper())] = new_name
                 except:
                     pass
             else:
                 continue
 
+    # Changing the names in the IDF objects and their references in one pass
+    try:
+        idfFile.rename_many(renames)
+    except ValueError as e:
+        # rename_many validates all the renames before changing the model; fall
+        # back to renaming the objects one at a time, skipping those that fail.
+        log(f"Renaming objects one at a time: {e}", lg.DEBUG)
+        for (obj, old_name), new_name in renames.items():
+            try:
+                idfFile.rename(obj, old_name, new_name)
+            except:
+                pass
+
     # Save equivalence between old and new names
     df = pd.DataFrame([old_new_eq])
     if not os.path.isdir(settings.data_folder):
@@ -8,7 +8,7 @@ from concurrent.futures.thread import ThreadPoolExecutor
 import numpy as np
 from path import Path
 
-from archetypal import IDF, log, parallel_process
+from archetypal import IDF, log, run_batch, simulation_key
 from archetypal.eplus_interface.exceptions import EnergyPlusProcessError
 from archetypal.template import (
     BuildingTemplate,
@@ -153,7 +153,9 @@ class UmiTemplateLibrary:
         self.GlazingMaterials = GlazingMaterials
 
     @classmethod
-    def read_idf(cls, idf_files, weather, name="unnamed", processors=-1, **kwargs):
+    def read_idf(
+        cls, idf_files, weather, name="unnamed", processors=-1, retries=0, **kwargs
+    ):
         """Initializes an UmiTemplateLibrary object from one or more idf_files.
 
         The resulting object contains the reduced version of the IDF files.
@@ -163,7 +165,10 @@ class UmiTemplateLibrary:
             idf_files (list of (str or Path)): list of IDF file paths.
             weather (str or Path): Path to the weather file.
             name (str): The name of the Template File
-            parallel (bool): If True, uses all available logical cores.
+            processors (int): The number of files processed in parallel; -1 uses
+                all available logical cores.
+            retries (int): The number of times the simulation of a file is
+                retried after an :class:`EnergyPlusProcessError`.
             kwargs: keyword arguments passed to IDF().
 
         Raises:
@@ -190,15 +195,33 @@ class UmiTemplateLibrary:
                 readvars=False,  # No need to readvars since only sql is used
                 **kwargs,
             )
-        results = parallel_process(
+        # Simulate each unique model once; the duplicates of a model reuse the
+        # simulation results of the first one.
+        for _ in run_batch(
             in_dict,
-            cls.template_complexity_reduction,
+            cls.simulate_idf,
             processors=processors,
             use_kwargs=True,
-            debug=True,
-            position=None,
             executor=ThreadPoolExecutor,
-        )
+            retries=retries,
+            position=None,
+            debug=True,
+            dedupe=simulation_key,
+        ):
+            pass
+        results = [
+            res
+            for _, res in run_batch(
+                in_dict,
+                cls.template_complexity_reduction,
+                processors=processors,
+                use_kwargs=True,
+                executor=ThreadPoolExecutor,
+                retries=retries,
+                position=None,
+                debug=True,
+            )
+        ]
         for res in results:
             if isinstance(res, EnergyPlusProcessError):
                 filename = (settings.logs_folder / "failed_reduce.txt").expand()
@@ -224,6 +247,18 @@ class UmiTemplateLibrary:
 
         return umi_template
 
+    @staticmethod
+    def simulate_idf(idfname, epw, **kwargs):
+        """Simulate a model unless its results already exist.
+
+        Returns:
+            str: The :attr:`~archetypal.idfclass.idf.IDF.sim_id` of the model.
+        """
+        idf = IDF(idfname, epw=epw, **kwargs)
+        if not idf.simulation_dir.exists():
+            idf.simulate()
+        return idf.sim_id
+
     @staticmethod
     def template_complexity_reduction(idfname, epw, **kwargs):
         idf = IDF(idfname, epw=epw, **kwargs)
@@ -12,8 +12,11 @@
 # project, which is licensed MIT License. This code therefore is also
 # licensed under the terms of the The MIT License (MIT).
 ################################################################################
+import asyncio
 import contextlib
 import datetime as dt
+import heapq
+import itertools
 import json
 import logging as lg
 import multiprocessing
@@ -23,7 +26,8 @@ import sys
 import time
 import unicodedata
 import warnings
-from collections import OrderedDict
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
 from concurrent.futures._base import as_completed
 from datetime import datetime, timedelta
 
@@ -34,6 +38,7 @@ from path import Path
 from tqdm import tqdm
 
 from archetypal import __version__, settings
+from archetypal.eplus_interface.exceptions import EnergyPlusProcessError
 from archetypal.eplus_interface.version import EnergyPlusVersion
 
 
@@ -54,6 +59,11 @@ def config(
     default_weight_factor="area",
     ep_version=settings.ep_version,
     debug=settings.debug,
+    cache_size_limit=settings.cache_size_limit,
+    scratch_folder=settings.scratch_folder,
+    scratch_min_free=settings.scratch_min_free,
+    memory_budget=settings.memory_budget,
+    report_sidecar=settings.report_sidecar,
 ):
     """Package configurations. Call this method at the beginning of script or at the
     top of an interactive python environment to set package-wide settings.
@@ -78,6 +88,22 @@ def config(
         default_weight_factor:
         ep_version (str): EnergyPlus version to use. eg. "9-2-0".
         debug (bool): Use debug behavior in various part of code base.
+        cache_size_limit (int): disk budget (in bytes) of the simulation results
+            cache. Least recently used results are evicted once the budget is
+            exceeded. If None, the cache is unbounded.
+        scratch_folder (str): local fast folder, e.g. "/dev/shm", in which the
+            simulation programs are run. Only the retained outputs are published
+            to the output directory of the model. If None, the programs are run
+            in the output directory.
+        scratch_min_free (int): free space (in bytes) required in scratch_folder
+            to run a program there. Below this, the run spills over to the output
+            directory.
+        memory_budget (int): memory (in bytes) available to the simulations run
+            concurrently by :func:`run_batch`. If None, the number of concurrent
+            simulations is only limited by the number of workers.
+        report_sidecar (bool): if True, the report data of each simulation is
+            also written to a columnar sidecar of its sql file, which is memory
+            mapped by the readers of report data.
 
     Returns:
         None
@@ -99,6 +125,13 @@ def config(
     settings.zone_weight.set_weigth_attr(default_weight_factor)
     settings.ep_version = EnergyPlusVersion(ep_version).dash
     settings.debug = debug
+    settings.cache_size_limit = cache_size_limit
+    settings.scratch_folder = (
+        None if scratch_folder is None else Path(scratch_folder).makedirs_p()
+    )
+    settings.scratch_min_free = scratch_min_free
+    settings.memory_budget = memory_budget
+    settings.report_sidecar = report_sidecar
 
     # if logging is turned on, log that we are configured
     if settings.log_file or settings.log_console:
@@ -656,6 +689,44 @@ def copy_file(files, where=None):
     return _unpack_tuple(list(files.values()))
 
 
+def link_or_copy(src, dst):
+    """Hard link `src` to `dst`, falling back to a copy when linking is not
+    possible (e.g.: different file systems or unsupported by the OS).
+
+    Args:
+        src (str or Path): path of the source file.
+        dst (str or Path): path of the destination file.
+
+    Returns:
+        Path: The destination path.
+    """
+    import shutil
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return Path(dst)
+
+
+def move_or_copy(src, dst):
+    """Move `src` to `dst` with an atomic rename, falling back to a hard link or
+    a copy when `src` and `dst` are not on the same file system.
+
+    Args:
+        src (str or Path): path of the source file.
+        dst (str or Path): path of the destination file.
+
+    Returns:
+        Path: The destination path.
+    """
+    try:
+        os.replace(src, dst)
+    except OSError:
+        link_or_copy(src, dst)
+    return Path(dst)
+
+
 @contextlib.contextmanager
 def cd(path):
     """
@@ -955,6 +1026,8 @@ def parallel_process(
     position=0,
     debug=False,
     executor=None,
+    dedupe=None,
+    memory_budget=None,
 ):
     """A parallel version of the map function with a progress b
 
@@ -982,10 +1055,43 @@ def parallel_process(
             Automatic if unspecified. Useful to manage multiple bars at once
             (eg, from threads).
         executor (Executor)
+        dedupe (callable, optional): Called with each value of `in_dict`; returns
+            the key of the group of the job, or None. The jobs of a group, e.g.
+            jobs simulating identical models (see :func:`simulation_key`), are
+            run once and the result is returned for each of them.
+        memory_budget (int, optional): The memory, in bytes, available to the
+            running jobs. Defaults to `settings.memory_budget`. If not None, the
+            jobs are scheduled by :func:`run_batch` with this budget and the
+            results are returned in the order of `in_dict`.
 
     Returns:
         [function(array[0]), function(array[1]), ...]
     """
+    if memory_budget is None:
+        memory_budget = settings.memory_budget
+    if memory_budget is not None:
+        batch = run_batch(
+            in_dict,
+            function,
+            processors=processors,
+            use_kwargs=use_kwargs,
+            executor=executor,
+            show_progress=show_progress,
+            position=position,
+            debug=debug,
+            dedupe=dedupe,
+            memory_budget=memory_budget,
+        )
+        return [result for _, result in batch]
+
+    keys = list(in_dict)
+    leader_of = {a: a for a in keys}  # key of the job run for each key
+    if dedupe is not None:
+        in_dict, leader_of = _dedupe_jobs(in_dict, dedupe)
+        saved = len(keys) - len(in_dict)
+        if saved:
+            log(f"De-duplication saved {saved} runs of '{function.__name__}'")
+
     if executor is None:
         from concurrent.futures import ThreadPoolExecutor
 
@@ -1007,50 +1113,29 @@ def parallel_process(
         "disable": not show_progress,
     }
 
+    results = {}  # key of the job run: result
     if processors == 1:
-        futures = []
-        out = []
         for a in tqdm(in_dict, **kwargs):
             if use_kwargs:
-                futures.append(submit(function, **in_dict[a]))
+                results[a] = submit(function, **in_dict[a])
             else:
-                futures.append(submit(function, in_dict[a]))
-        for job in futures:
-            out.append(job)
+                results[a] = submit(function, in_dict[a])
     else:
         with _executor_factory(
             max_workers=processors,
             initializer=config,
-            initargs=(
-                settings.data_folder,
-                settings.logs_folder,
-                settings.imgs_folder,
-                settings.cache_folder,
-                settings.use_cache,
-                settings.log_file,
-                settings.log_console,
-                settings.log_level,
-                settings.log_name,
-                settings.log_filename,
-                settings.useful_idf_objects,
-                settings.umitemplate,
-                settings.trnsys_default_folder,
-                "area",
-                settings.ep_version,
-                settings.debug,
-            ),
+            initargs=_config_initargs(),
         ) as executor:
-            out = []
-            futures = []
+            futures = {}
 
             if use_kwargs:
                 for a in in_dict:
                     future = executor.submit(function, **in_dict[a])
-                    futures.append(future)
+                    futures[future] = a
             else:
                 for a in in_dict:
                     future = executor.submit(function, in_dict[a])
-                    futures.append(future)
+                    futures[future] = a
 
             # Print out the progress as tasks complete
             for job in tqdm(as_completed(futures), **kwargs):
@@ -1062,9 +1147,387 @@ def parallel_process(
                         lg.warning(str(e))
                         raise e
                     result_done = e
-                # Append to the list of results
-                out.append(result_done)
-    return out
+                results[futures[job]] = result_done
+    # In the order of in_dict, the result of each job of a group being that of
+    # the job run for the group
+    return [results[leader_of[a]] for a in keys]
+
+
+def _dedupe_jobs(in_dict, dedupe):
+    """Keep the first job of each group of jobs of `in_dict`.
+
+    Returns:
+        tuple: The jobs kept (dict) and the key of the job kept for each key of
+        `in_dict` (dict).
+    """
+    leaders, leader_of = {}, {}
+    for a, spec in in_dict.items():
+        group = dedupe(spec)
+        leader_of[a] = a if group is None else leaders.setdefault(group, a)
+    kept = OrderedDict((a, in_dict[a]) for a in in_dict if leader_of[a] == a)
+    return kept, leader_of
+
+
+def run_batch(
+    jobs,
+    function,
+    processors=-1,
+    use_kwargs=True,
+    executor=None,
+    window=None,
+    retries=0,
+    backoff=1.0,
+    retry_on=(EnergyPlusProcessError,),
+    show_progress=True,
+    position=0,
+    debug=False,
+    dedupe=None,
+    memory_budget=None,
+    memory_cost=None,
+):
+    """Apply `function` to a batch of jobs and yield the results in input order.
+
+    Unlike :func:`parallel_process`, jobs are submitted lazily: at most `window`
+    jobs are running or waiting to be yielded at any time, so that `jobs` can be
+    a generator of any length and results do not pile up if the caller consumes
+    them slowly. A job raising one of `retry_on` (e.g. a transient
+    :class:`EnergyPlusProcessError`) is retried up to `retries` times, waiting
+    ``backoff * 2 ** attempt`` seconds before each attempt, without holding up the
+    other jobs.
+
+    With `dedupe`, jobs of a same group, e.g. jobs simulating identical models
+    (see :func:`simulation_key`), are run once and the result is yielded for each
+    of them. If `jobs` is a dict or a list, all the jobs of a group are grouped;
+    otherwise, only the duplicates of a job still running or waiting to be
+    yielded are.
+
+    With a `memory_budget`, jobs are admitted in input order only while the sum of
+    the memory costs of the admitted jobs fits the budget, so that many small
+    models can run at once but a few large ones do not exhaust the memory. A job
+    is always admitted if no other job is, even if its cost exceeds the budget.
+
+    Examples:
+        >>> from archetypal import IDF, run_batch
+        >>> wf = 'tests/input_data/CAN_PQ_Montreal.Intl.AP.716270_CWEC.epw'
+        >>> jobs = {file: dict(idfname=file, epw=wf) for file in files}
+        >>> for file, idf in run_batch(jobs, IDF, processors=4, retries=2):
+        >>>     idf.simulate()
+
+    Args:
+        jobs (dict or iterable): A dict of {key: spec} or an iterable of (key,
+            spec) tuples. `function` is applied to each spec and the key is used
+            as an identifier.
+        function (callable): The function to apply. Must be picklable if
+            `executor` is a ProcessPoolExecutor.
+        processors (int): The number of workers; -1 uses all the cores. If 1, jobs
+            are run one after the other in the calling thread.
+        use_kwargs (bool): If True, pass the specs as keyword arguments to
+            `function`.
+        executor (type): The Executor class creating the workers; a
+            ThreadPoolExecutor (default) or a ProcessPoolExecutor for process
+            based workers.
+        window (int, optional): The maximum number of jobs running or waiting to
+            be yielded. Defaults to twice the number of workers.
+        retries (int): The number of times a job is retried.
+        backoff (float): The wait in seconds before the first retry; doubled at
+            each retry.
+        retry_on (tuple of type): The exceptions for which a job is retried.
+        show_progress (bool): If True, show a progress bar.
+        position (int): The line offset of the tqdm bar.
+        debug (bool): If True, raise the exception of a failed job instead of
+            yielding it.
+        dedupe (callable, optional): Called with each spec; returns the key of
+            the group of the job, or None if the job is not to be grouped.
+        memory_budget (int, optional): The memory, in bytes, available to the
+            running jobs. Defaults to `settings.memory_budget`; None admits jobs
+            regardless of their memory cost.
+        memory_cost (callable, optional): Called with each spec; returns its
+            memory cost in bytes. Defaults to
+            :func:`~archetypal.memory.memory_cost`, which estimates the peak
+            memory of the simulation of the model from its size and learns from
+            the peaks measured for the previous runs.
+
+    Yields:
+        tuple: (key, result) where result is the return value of `function` or the
+        Exception raised by its last attempt, in the order of `jobs`.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    if processors == -1:
+        processors = multiprocessing.cpu_count()
+    if processors == 1:
+        pool = _InlineExecutor()
+    else:
+        pool = (executor or ThreadPoolExecutor)(
+            max_workers=processors,
+            initializer=config,
+            initargs=_config_initargs(),
+        )
+    window = window or 2 * processors
+    items = iter(jobs.items() if isinstance(jobs, dict) else jobs)
+    if memory_budget is None:
+        memory_budget = settings.memory_budget
+    if memory_budget is not None and memory_cost is None:
+        from archetypal.memory import memory_cost
+
+    members = Counter()  # number of jobs of a group not yielded yet
+    groups = None
+    if dedupe is not None and hasattr(jobs, "__len__"):
+        items = list(items)
+        groups = [dedupe(spec) for _, spec in items]
+        members.update(group for group in groups if group is not None)
+        groups, items = iter(groups), iter(items)
+    progress = tqdm(
+        desc=getattr(function, "__name__", None),
+        total=len(jobs) if hasattr(jobs, "__len__") else None,
+        unit="runs",
+        unit_scale=True,
+        position=position,
+        disable=not show_progress,
+    )
+
+    order = deque()  # ids of the jobs not yielded yet, in input order
+    specs, attempts, results = {}, {}, {}
+    running = {}  # future: id
+    delayed = []  # heap of (time, id) of the jobs waiting to be retried
+    group_of, leaders, shared = {}, {}, {}  # id: group, group: id, group: result
+    queued, costs = deque(), {}  # ids of the jobs waiting for memory, id: cost
+    held = {}  # id: memory cost of the admitted jobs not done yet
+    ids = itertools.count()
+    exhausted = False
+    saved = 0
+
+    def submit(job_id):
+        _, spec = specs[job_id]
+        if use_kwargs:
+            future = pool.submit(function, **spec)
+        else:
+            future = pool.submit(function, spec)
+        running[future] = job_id
+
+    def admit():
+        while queued:
+            cost = costs[queued[0]]
+            if memory_budget is not None and held:
+                if sum(held.values()) + cost > memory_budget:
+                    break
+            job_id = queued.popleft()
+            held[job_id] = costs.pop(job_id)
+            submit(job_id)
+
+    try:
+        while True:
+            while delayed and delayed[0][0] <= time.monotonic():
+                submit(heapq.heappop(delayed)[1])
+            while not exhausted and len(order) < window:
+                try:
+                    key, spec = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                job_id = next(ids)
+                order.append(job_id)
+                specs[job_id] = (key, spec)
+                attempts[job_id] = 0
+                if groups is not None:
+                    group = next(groups)
+                else:
+                    group = dedupe(spec) if dedupe is not None else None
+                    if group is not None:
+                        members[group] += 1
+                if group is not None:
+                    group_of[job_id] = group
+                    if group in leaders:
+                        saved += 1  # gets the result of the leader of its group
+                        continue
+                    leaders[group] = job_id
+                queued.append(job_id)
+                costs[job_id] = 0 if memory_budget is None else memory_cost(spec)
+            admit()
+            while order:
+                job_id = order[0]
+                group = group_of.get(job_id)
+                if job_id not in results and group in shared:
+                    results[job_id] = shared[group]
+                    progress.update()
+                if job_id not in results:
+                    break
+                order.popleft()
+                key, _ = specs.pop(job_id)
+                del attempts[job_id]
+                if group_of.pop(job_id, None) is not None:
+                    members[group] -= 1
+                    if members[group] <= 0:
+                        del members[group]
+                        leaders.pop(group, None)
+                        shared.pop(group, None)
+                yield key, results.pop(job_id)
+            if not order:
+                if exhausted:
+                    break
+                continue
+
+            timeout = None
+            if delayed:
+                timeout = max(delayed[0][0] - time.monotonic(), 0)
+            if not running:
+                time.sleep(timeout)
+                continue
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id = running.pop(future)
+                try:
+                    results[job_id] = future.result()
+                except Exception as e:
+                    if isinstance(e, retry_on) and attempts[job_id] < retries:
+                        delay = backoff * 2 ** attempts[job_id]
+                        attempts[job_id] += 1
+                        log(
+                            f"retrying '{specs[job_id][0]}' in {delay:,.1f} seconds "
+                            f"(attempt {attempts[job_id]} of {retries}): {e}",
+                            lg.WARNING,
+                        )
+                        heapq.heappush(delayed, (time.monotonic() + delay, job_id))
+                        continue
+                    if debug:
+                        raise e
+                    results[job_id] = e
+                if job_id in group_of:
+                    shared[group_of[job_id]] = results[job_id]
+                held.pop(job_id, None)
+                progress.update()
+        if saved:
+            name = getattr(function, "__name__", function)
+            log(f"De-duplication saved {saved} runs of '{name}'")
+    finally:
+        for future in running:
+            future.cancel()
+        pool.shutdown()
+        progress.close()
+
+
+# Keyword arguments of IDF that change the results of a simulation
+_SIMULATION_ARGS = [
+    "annual",
+    "as_version",
+    "convert",
+    "design_day",
+    "epmacro",
+    "expandobjects",
+    "output_suffix",
+    "prep_outputs",
+    "readvars",
+]
+
+
+def simulation_key(spec):
+    """The key grouping the jobs of :func:`run_batch` or :func:`parallel_process`
+    that simulate the same model with the same run arguments.
+
+    The key hashes the content of the model, of its weather file and of its
+    include files (see :func:`~archetypal.idfclass.util.hash_model`) with the
+    arguments changing the results of the simulation, so that byte-identical
+    models stored in different files are simulated once.
+
+    Args:
+        spec (dict): The keyword arguments of :class:`~archetypal.idfclass.IDF`.
+
+    Returns:
+        str: The key, or None if `spec` has no "idfname".
+    """
+    from archetypal.idfclass.util import hash_model
+
+    if not isinstance(spec, dict) or spec.get("idfname") is None:
+        return None
+    kwargs = {arg: str(spec[arg]) for arg in _SIMULATION_ARGS if arg in spec}
+    if spec.get("keep") is not None:
+        kwargs["keep"] = ",".join(sorted(spec["keep"]))
+    epw = spec.get("epw")
+    return hash_model(
+        spec["idfname"],
+        epw=[epw] if epw else [],
+        include=list(spec.get("include") or []),
+        **kwargs,
+    )
+
+
+class _InlineExecutor:
+    """An Executor running the submitted calls right away in the calling thread."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def _config_initargs():
+    """The arguments of :func:`config` reproducing the current settings in
+    worker processes."""
+    return (
+        settings.data_folder,
+        settings.logs_folder,
+        settings.imgs_folder,
+        settings.cache_folder,
+        settings.use_cache,
+        settings.log_file,
+        settings.log_console,
+        settings.log_level,
+        settings.log_name,
+        settings.log_filename,
+        settings.useful_idf_objects,
+        settings.umitemplate,
+        settings.trnsys_default_folder,
+        "area",
+        settings.ep_version,
+        settings.debug,
+        settings.cache_size_limit,
+        settings.scratch_folder,
+        settings.scratch_min_free,
+        settings.memory_budget,
+        settings.report_sidecar,
+    )
+
+
+async def simulate_async_many(idfs, max_concurrency=None, timeout=None, **kwargs):
+    """Simulate models concurrently from an asyncio event loop.
+
+    Each model is simulated with :meth:`~archetypal.idfclass.idf.IDF.simulate_async`;
+    at most `max_concurrency` EnergyPlus processes run at the same time. If the
+    task awaiting this coroutine is cancelled, the running EnergyPlus processes
+    are killed.
+
+    Examples:
+        >>> from archetypal import IDF, simulate_async_many
+        >>> idfs = [IDF(file, epw=wf) for file in files]
+        >>> results = await simulate_async_many(idfs, max_concurrency=4, timeout=600)
+
+    Args:
+        idfs (list of IDF): The models to simulate.
+        max_concurrency (int, optional): The maximum number of concurrent
+            simulations. Defaults to the number of CPUs.
+        timeout (float, optional): Number of seconds after which a simulation is
+            killed.
+        **kwargs: Keyword arguments passed to :meth:`IDF.simulate_async`.
+
+    Returns:
+        list: The simulated model or the raised Exception of each model, in the
+        order of `idfs`.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or multiprocessing.cpu_count())
+
+    async def simulate(idf):
+        async with semaphore:
+            return await idf.simulate_async(timeout=timeout, **kwargs)
+
+    return await asyncio.gather(
+        *(simulate(idf) for idf in idfs), return_exceptions=True
+    )
 
 
 def submit(fn, *args, **kwargs):